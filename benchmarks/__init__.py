@@ -0,0 +1,8 @@
+"""
+Benchmarks of the music cogs, one module per measured change.
+
+Run a benchmark from the repository root, e.g. `python -m benchmarks.queue`. The
+data is synthetic and the upstream services are faked, so the numbers compare
+code paths, not providers. The benchmarks that import the cogs need the bot
+dependencies installed.
+"""
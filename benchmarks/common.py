@@ -0,0 +1,79 @@
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+def best_of(
+    func: Callable[..., Any],
+    repeat: int = 5,
+    setup: Optional[Callable[[], Any]] = None,
+) -> float:
+    """
+    Time a function.
+
+    Args:
+        func (Callable[..., Any]): The function to time.
+        repeat (int): Number of measures, the fastest is kept.
+        setup (Callable[[], Any] | None): Called before each measure, not timed. Its
+            return value is passed to `func`.
+
+    Returns:
+        float: The time of one call, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        gc.collect()
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def cpu_of(func: Callable[[], Any], repeat: int = 5) -> float:
+    """CPU time of one call of `func`, in seconds, the lowest of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.process_time()
+        func()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def allocations_of(func: Callable[[], Any]) -> Tuple[Any, int, int]:
+    """
+    Trace the memory allocated by one call of `func`.
+
+    Returns:
+        Tuple[Any, int, int]: The return value, the bytes it still holds once
+        `func` returned, and the peak of traced bytes during the call.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained, peak
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence[Any]]) -> None:
+    """Print rows as a left-aligned text table."""
+    cells = [[str(cell) for cell in row] for row in [headers, *rows]]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for n, row in enumerate(cells):
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        if n == 0:
+            print("  ".join("-" * width for width in widths))
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.3f} ms"
+
+
+def mib(size: int) -> str:
+    return f"{size / 2**20:.2f} MiB"
@@ -0,0 +1,100 @@
+"""
+Enqueue throughput: adding a playlist song by song, as `PlaylistManager.add_songs`
+did (`asyncio.gather` of `PlayList.add` or `add_next`), against one
+`PlayList.add_many` call.
+
+The observer stands in for `PlaylistObserver`, which tries to start the next song
+on every notification. The background resolution of the next songs is replaced by
+a no-op.
+
+    python -m benchmarks.enqueue
+"""
+
+import asyncio
+import time
+from typing import List
+
+from benchmarks.common import print_table
+from cogs.music.core import prefetch
+from cogs.music.core.playlist import PlayList
+from cogs.music.core.song import YouTubeSongMeta
+from patterns.observe import Observable, Observer
+
+SIZES = (100, 500, 2000)
+
+
+class CountingObserver(Observer):
+    def __init__(self) -> None:
+        self.updates = 0
+
+    async def update(self, observable: Observable) -> None:
+        # Audio.play_next takes the playlist lock and finds a song already playing.
+        self.updates += 1
+        await asyncio.sleep(0)
+
+
+async def _no_resolution(song_meta):
+    return None
+
+
+def _songs(count: int) -> List[YouTubeSongMeta]:
+    return [
+        YouTubeSongMeta(
+            title=f"Song {i}",
+            duration_ms=200_000,
+            playlist_name="Playlist",
+            webpage_url=f"https://www.youtube.com/watch?v={i:011d}",
+            author="Channel",
+            requester_id=1,
+            video_id=f"{i:011d}",
+        )
+        for i in range(count)
+    ]
+
+
+async def _run(count: int, priority: bool, bulk: bool) -> List[str]:
+    playlist = PlayList()
+    observer = CountingObserver()
+    playlist.attach(observer)
+    # A song already queued, so play next inserts in front of it.
+    playlist.restore(_songs(1))
+    songs = _songs(count)
+
+    start = time.perf_counter()
+    if bulk:
+        await playlist.add_many(songs, priority=priority)
+    else:
+        add = playlist.add_next if priority else playlist.add
+        await asyncio.gather(*(add(song) for song in songs))
+    elapsed = time.perf_counter() - start
+
+    queued = playlist.window(0, playlist.size())
+    added = queued[:count] if priority else queued[1:]
+    in_order = [song.video_id for song in added] == [song.video_id for song in songs]
+    playlist._prefetcher.clear()
+    return [
+        str(count),
+        "play next" if priority else "append",
+        "add_many" if bulk else "per song",
+        f"{elapsed * 1000:.2f} ms",
+        f"{count / elapsed:,.0f}",
+        str(observer.updates),
+        "yes" if in_order else "no",
+    ]
+
+
+async def main() -> None:
+    rows = []
+    for count in SIZES:
+        for priority in (False, True):
+            for bulk in (False, True):
+                rows.append(await _run(count, priority, bulk))
+    print_table(
+        ["songs", "mode", "path", "time", "songs/s", "notifications", "order kept"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    prefetch.createSong = _no_resolution
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+The queue ETA path (`PlayList.time_wait` and `PlaylistManager.calculate_wait_time`,
+run for every song added), before and after durations became integer
+milliseconds.
+
+- strings: durations stored as "H:MM:SS", every one parsed with `strptime` and
+  summed, as before.
+- int ms, summed: the same walk over the queue on integer milliseconds.
+- int ms, Fenwick: `IndexedQueue.weight_before`, what `time_wait` runs now.
+
+    python -m benchmarks.eta
+"""
+
+import random
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, List
+
+from benchmarks.common import best_of, ms, print_table
+from cogs.music.core.queue import IndexedQueue
+
+SIZES = (100, 3000)
+QUERIES = 100
+
+
+def format_duration(duration_ms: int) -> str:
+    """The duration format of the queue before, see `utils.format_duration` then."""
+    duration = timedelta(milliseconds=duration_ms)
+    return str(duration - timedelta(microseconds=duration.microseconds))
+
+
+def convert_to_second(time: str) -> float:
+    """`utils.convert_to_second` before."""
+    dt: timedelta = datetime.strptime(time, "%H:%M:%S") - datetime(1900, 1, 1)
+    return dt.total_seconds()
+
+
+class StringEntry:
+    __slots__ = ("duration",)
+
+    def __init__(self, duration: str) -> None:
+        self.duration = duration
+
+
+class MsEntry:
+    __slots__ = ("duration_ms",)
+
+    def __init__(self, duration_ms: int) -> None:
+        self.duration_ms = duration_ms
+
+
+def run(size: int) -> List[List[str]]:
+    rng = random.Random(size)
+    durations = [rng.randint(60, 600) * 1000 for _ in range(size)]
+    indexes = [rng.randrange(size) for _ in range(QUERIES)]
+
+    strings: Deque[StringEntry] = deque(StringEntry(format_duration(d)) for d in durations)
+    ints: Deque[MsEntry] = deque(MsEntry(d) for d in durations)
+    indexed: IndexedQueue[MsEntry] = IndexedQueue()
+    indexed.extend(list(ints), durations)
+
+    def with_strings() -> List[float]:
+        # time_wait returned the sum as a string too, parsed again by
+        # calculate_wait_time. Left out: it failed past 24 hours ("1 day, ...").
+        return [
+            sum(convert_to_second(strings[i].duration) for i in range(index))
+            for index in indexes
+        ]
+
+    def with_ints() -> List[int]:
+        return [sum(ints[i].duration_ms for i in range(index)) for index in indexes]
+
+    def with_fenwick() -> List[float]:
+        return [indexed.weight_before(index) for index in indexes]
+
+    assert [int(w * 1000) for w in with_strings()] == with_ints() == with_fenwick()
+
+    rows = []
+    baseline = None
+    for name, func in (
+        ("strings", with_strings),
+        ("int ms, summed", with_ints),
+        ("int ms, Fenwick", with_fenwick),
+    ):
+        elapsed = best_of(func, repeat=3)
+        baseline = baseline or elapsed
+        rows.append(
+            [str(size), name, ms(elapsed / QUERIES), f"{baseline / elapsed:.1f}x"]
+        )
+    return rows
+
+
+def main() -> None:
+    rows = []
+    for size in SIZES:
+        rows.extend(run(size))
+    print(f"ETA of a song at a random position, mean of {QUERIES} queries")
+    print_table(["songs", "durations", "per query", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
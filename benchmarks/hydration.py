@@ -0,0 +1,191 @@
+"""
+Hydrating a queue of 2,000 songs (a third each from YouTube, SoundCloud and
+Spotify) with `get_songs_info`, against the previous implementation: one YouTube
+object per video built on the event loop, one Spotify request per track, and
+SoundCloud tracks matched back with a scan of the songs.
+
+The provider clients are fakes that count the requests and block for a fixed
+latency per request, so the wall times compare how the requests are issued.
+
+    python -m benchmarks.hydration [--latency SECONDS] [--songs N]
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import List
+
+import constants
+from benchmarks import samples
+from benchmarks.common import print_table
+from cogs.music.core import song as song_module
+from cogs.music.core.song import (
+    SongMeta,
+    SoundCloudSongMeta,
+    SpotifySongMeta,
+    YouTubeSongMeta,
+    get_songs_info,
+)
+from cogs.music.services.soundcloud.service import SoundCloudService
+from cogs.music.services.spotify.service import SpotifyService
+from cogs.music.services.spotify.track import load_track
+from utils.executor import run_blocking
+from utils.scheduler import RequestScheduler
+
+REQUESTS: Counter = Counter()
+LATENCY = 0.01
+
+
+class FakeYouTube:
+    def __init__(self, url: str, client: str = "WEB") -> None:
+        REQUESTS["youtube"] += 1
+        time.sleep(LATENCY)
+        self.video_id = url.rsplit("=", 1)[1]
+        self.title = f"Video {self.video_id}"
+        self.length = 200
+        self.watch_url = url
+        self.author = "Channel"
+
+
+class FakeSoundCloud:
+    def get_tracks(self, track_ids: List[int]) -> List[SimpleNamespace]:
+        REQUESTS["soundcloud"] += 1
+        time.sleep(LATENCY)
+        return [
+            SimpleNamespace(
+                id=track_id,
+                title=f"Track {track_id}",
+                duration=200_000,
+                permalink_url=f"https://soundcloud.com/user/{track_id}",
+                user=SimpleNamespace(username="User"),
+            )
+            for track_id in track_ids
+        ]
+
+
+class FakeSpotipy:
+    @staticmethod
+    def _track(track_id: str) -> dict:
+        return {**samples.track(int(track_id[5:])), "id": track_id}
+
+    def track(self, track_id: str, market: str = "") -> dict:
+        REQUESTS["spotify"] += 1
+        time.sleep(LATENCY)
+        return self._track(track_id)
+
+    def tracks(self, track_ids: List[str], market: str = "") -> dict:
+        REQUESTS["spotify"] += 1
+        time.sleep(LATENCY)
+        return {"tracks": [self._track(track_id) for track_id in track_ids]}
+
+
+def install_fakes() -> None:
+    """Make the services use the fake clients, without their real setup."""
+    song_module.YouTube = FakeYouTube
+
+    soundcloud = object.__new__(SoundCloudService)
+    soundcloud.sc = FakeSoundCloud()
+    soundcloud.client_id = "client"
+    soundcloud.scheduler = RequestScheduler(
+        "soundcloud",
+        concurrency=constants.SOUNDCLOUD_REQUEST_CONCURRENCY,
+        rate=constants.SOUNDCLOUD_REQUEST_RATE,
+        burst=constants.SOUNDCLOUD_REQUEST_BURST,
+    )
+    SoundCloudService._instance = soundcloud
+
+    spotify = object.__new__(SpotifyService)
+    spotify.sp = FakeSpotipy()
+    spotify.market = "VN"
+    SpotifyService._instance = spotify
+
+
+async def legacy_get_songs_info(songs: List[SongMeta]) -> List[SongMeta]:
+    """`get_songs_info` before the batched hydration, on the current models."""
+    sc_songs = [s for s in songs if isinstance(s, SoundCloudSongMeta)]
+    yt_songs = [s for s in songs if isinstance(s, YouTubeSongMeta)]
+    sp_songs = [s for s in songs if isinstance(s, SpotifySongMeta)]
+
+    for song in yt_songs:
+        video = song_module.YouTube(
+            f"https://www.youtube.com/watch?v={song.video_id}", client="WEB"
+        )
+        song.update_meta(video)
+
+    sc = SoundCloudService().sc
+    ids = [song.track_id for song in sc_songs]
+    chunks = await asyncio.gather(
+        *(
+            run_blocking("soundcloud", sc.get_tracks, ids[i : i + 50])
+            for i in range(0, len(ids), 50)
+        )
+    )
+    for tracks in chunks:
+        for track in tracks:
+            song = next((s for s in sc_songs if s.track_id == track.id), None)
+            if song:
+                song.update_meta(track)
+
+    sp = SpotifyService().sp
+    for song in sp_songs:
+        track = await run_blocking("spotify", sp.track, song.track_id)
+        song.update_meta(load_track(track))
+    return songs
+
+
+def _queue(size: int) -> List[SongMeta]:
+    songs: List[SongMeta] = []
+    common = dict(
+        title=None,
+        duration_ms=0,
+        playlist_name=None,
+        webpage_url=None,
+        author=None,
+        requester_id=1,
+    )
+    for i in range(size):
+        if i % 3 == 0:
+            songs.append(YouTubeSongMeta(**common, video_id=f"{i:011d}"))
+        elif i % 3 == 1:
+            songs.append(SoundCloudSongMeta(**common, track_id=i))
+        else:
+            songs.append(SpotifySongMeta(**common, track_id=f"track{i:017d}"))
+    return songs
+
+
+async def _measure(name: str, hydrate, size: int) -> List[str]:
+    songs = _queue(size)
+    REQUESTS.clear()
+    start = time.perf_counter()
+    await hydrate(songs)
+    elapsed = time.perf_counter() - start
+    assert all(song.title is not None for song in songs), name
+    return [
+        name,
+        str(REQUESTS["youtube"]),
+        str(REQUESTS["soundcloud"]),
+        str(REQUESTS["spotify"]),
+        str(sum(REQUESTS.values())),
+        f"{elapsed:.2f} s",
+    ]
+
+
+async def main(size: int) -> None:
+    install_fakes()
+    rows = [
+        await _measure("before", legacy_get_songs_info, size),
+        await _measure("get_songs_info", get_songs_info, size),
+    ]
+    print(f"{size} songs, {LATENCY * 1000:.0f} ms per request")
+    print_table(["path", "YouTube", "SoundCloud", "Spotify", "requests", "wall time"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Seconds per request.")
+    parser.add_argument("--songs", type=int, default=2000)
+    args = parser.parse_args()
+    LATENCY = args.latency
+    asyncio.run(main(args.songs))
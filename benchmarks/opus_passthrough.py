@@ -0,0 +1,83 @@
+"""
+CPU per stream of the two playback paths of `Audio._create_source`:
+
+- transcode: `FFmpegPCMAudio`, FFmpeg decodes to PCM and discord.py encodes every
+  20 ms frame to Opus (done by the voice client, here with `discord.opus.Encoder`).
+- passthrough: `FFmpegOpusAudio` with `codec="copy"`, FFmpeg only remuxes the Opus
+  packets, nothing is decoded or encoded.
+
+The audio is read as fast as possible, so the CPU time is the cost of a stream,
+given per minute of audio. Needs FFmpeg, libopus and an Opus file (e.g. a WebM
+downloaded from YouTube, itag 251).
+
+    python -m benchmarks.opus_passthrough FILE [--seconds N]
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+from typing import List, Optional
+
+import discord
+import discord.opus
+from benchmarks.common import print_table
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _measure(
+    name: str, source: discord.AudioSource, encoder: Optional[discord.opus.Encoder]
+) -> List[str]:
+    children, own = _children_cpu(), time.process_time()
+    frames = 0
+    while frame := source.read():
+        if encoder is not None:
+            encoder.encode(frame, encoder.SAMPLES_PER_FRAME)
+        frames += 1
+    source.cleanup()  # Waits for FFmpeg to exit, so its CPU time is counted.
+    ffmpeg_cpu = _children_cpu() - children
+    python_cpu = time.process_time() - own
+    minutes = frames * 0.02 / 60
+    return [
+        name,
+        f"{frames * 0.02:.0f} s",
+        f"{ffmpeg_cpu / minutes:.3f} s",
+        f"{python_cpu / minutes:.3f} s",
+        f"{(ffmpeg_cpu + python_cpu) / minutes:.3f} s",
+    ]
+
+
+def main(path: str, seconds: int) -> None:
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+    options = {"options": f"-vn -t {seconds}"}
+    codec, bitrate = asyncio.run(discord.FFmpegOpusAudio.probe(path))
+    if codec != "opus":
+        raise SystemExit(f"{path} is {codec}, not opus: nothing to pass through.")
+
+    rows = [
+        _measure(
+            "transcode",
+            discord.FFmpegPCMAudio(path, **options),
+            discord.opus.Encoder(),
+        ),
+        _measure(
+            "passthrough",
+            discord.FFmpegOpusAudio(path, codec="copy", bitrate=bitrate, **options),
+            None,
+        ),
+    ]
+    print(f"CPU time per minute of audio, {path}")
+    print_table(["path", "audio", "FFmpeg", "Python", "total"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="An Opus audio file, e.g. a YouTube itag 251 WebM.")
+    parser.add_argument("--seconds", type=int, default=300, help="Seconds of audio read.")
+    args = parser.parse_args()
+    main(args.file, args.seconds)
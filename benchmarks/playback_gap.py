@@ -0,0 +1,86 @@
+"""
+The playback gap, from the end of a song to the next one being ready to play, with
+and without the `Prefetcher`. FFmpeg starting, counted by the `PLAYBACK_GAP`
+histogram of the bot, is left out.
+
+Songs play for `--play` seconds and take `--resolve` seconds to resolve (the
+playback URL and info), on average, with some jitter. Without prefetching, the next
+song is resolved once the previous one ended, as before; with it, the next songs
+are resolved while the current one plays.
+
+    python -m benchmarks.playback_gap [--songs N] [--play SECONDS] [--resolve SECONDS]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Deque, List
+
+from benchmarks.common import print_table
+from cogs.music.core import prefetch
+from cogs.music.core.prefetch import Prefetcher
+
+RESOLVE = 0.3
+
+
+async def _resolve(song_meta: SimpleNamespace) -> SimpleNamespace:
+    await asyncio.sleep(song_meta.resolve)
+    return SimpleNamespace(title=song_meta.title)
+
+
+async def _play(songs: List[SimpleNamespace], play: float, prefetching: bool) -> List[float]:
+    queue: Deque[SimpleNamespace] = deque(songs)
+    prefetcher = Prefetcher()
+    gaps = []
+    if prefetching:
+        prefetcher.sync(queue)
+    while queue:
+        ended_at = time.perf_counter()
+        meta = queue.popleft()
+        if prefetching:
+            song = prefetcher.take(meta)
+            prefetcher.sync(queue)
+        else:
+            song = prefetch.createSong(meta)
+        await song
+        gaps.append(time.perf_counter() - ended_at)
+        await asyncio.sleep(play)
+    prefetcher.clear()
+    return gaps
+
+
+async def main(count: int, play: float, resolve: float) -> None:
+    rng = random.Random(0)
+    songs = [
+        SimpleNamespace(title=f"Song {i}", resolve=rng.uniform(0.5, 1.5) * resolve)
+        for i in range(count)
+    ]
+    rows = []
+    for name, prefetching in (("resolve on song end", False), ("prefetch", True)):
+        gaps = await _play(songs, play, prefetching)
+        # The first song can't be prefetched, it is resolved when queued.
+        after_first = gaps[1:]
+        rows.append(
+            [
+                name,
+                f"{gaps[0] * 1000:.0f} ms",
+                f"{statistics.mean(after_first) * 1000:.1f} ms",
+                f"{max(after_first) * 1000:.1f} ms",
+            ]
+        )
+    print(f"{count} songs of {play}s, resolved in {resolve}s on average")
+    print_table(["path", "first song", "mean gap", "max gap"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=10)
+    parser.add_argument("--play", type=float, default=0.5, help="Seconds each song plays.")
+    parser.add_argument("--resolve", type=float, default=RESOLVE, help="Seconds to resolve a song.")
+    args = parser.parse_args()
+    prefetch.createSong = _resolve
+    asyncio.run(main(args.songs, args.play, args.resolve))
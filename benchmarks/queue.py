@@ -0,0 +1,153 @@
+"""
+`IndexedQueue` against the `deque` that backed `PlayList` before, on the
+operations of the queue commands, for queues of a few thousand songs.
+
+- index: position of a song (the song added embed, /remove by song).
+- remove song, remove at: /remove.
+- time before: the sum of the durations before a position (the ETA).
+- insert pages: a playlist played next, 20 pages of 100 songs inserted one
+  after the other, after the first song ("front") or after the song in the
+  middle of the queue ("middle").
+
+    python -m benchmarks.queue
+"""
+
+import random
+from collections import deque
+from typing import Callable, Deque, List, Tuple
+
+from benchmarks.common import best_of, ms, print_table
+from cogs.music.core.queue import IndexedQueue
+
+SIZES = (3000, 30000)
+LOOKUPS = 200
+PAGES = 20
+PAGE_SIZE = 100
+
+
+class Entry:
+    __slots__ = ("duration_ms",)
+
+    def __init__(self, duration_ms: int) -> None:
+        self.duration_ms = duration_ms
+
+
+def _pages() -> List[List[Entry]]:
+    return [[Entry(200_000) for _ in range(PAGE_SIZE)] for _ in range(PAGES)]
+
+
+def run(size: int) -> List[List[str]]:
+    rng = random.Random(size)
+    entries = [Entry(rng.randint(60_000, 600_000)) for _ in range(size)]
+    picks = [rng.randrange(size) for _ in range(LOOKUPS)]
+    removals = [rng.randrange(size - LOOKUPS) for _ in range(LOOKUPS)]
+
+    def new_deque() -> Deque[Entry]:
+        return deque(entries)
+
+    def new_indexed() -> IndexedQueue[Entry]:
+        q: IndexedQueue[Entry] = IndexedQueue()
+        q.extend(entries, [entry.duration_ms for entry in entries])
+        return q
+
+    def deque_insert_pages(index: int) -> Callable:
+        def insert(args: Tuple[Deque[Entry], List[List[Entry]]]) -> None:
+            q, pages = args
+            i = index
+            for page in pages:
+                for entry in page:
+                    q.insert(i, entry)
+                    i += 1
+
+        return insert
+
+    def indexed_insert_pages(index: int) -> Callable:
+        def insert(args: Tuple[IndexedQueue[Entry], List[List[Entry]]]) -> None:
+            q, pages = args
+            i = index
+            for page in pages:
+                q.insert_many(i, page, [entry.duration_ms for entry in page])
+                i += len(page)
+
+        return insert
+
+    def deque_remove_at(q: Deque[Entry]) -> None:
+        for i in removals:
+            del q[i]
+
+    d, q = new_deque(), new_indexed()
+    assert all(d.index(entries[i]) == q.index(entries[i]) for i in picks)
+    assert sum(e.duration_ms for e in list(d)[: size // 2]) == q.weight_before(size // 2)
+
+    cases: List[Tuple[str, int, Callable, Callable, Callable, Callable]] = [
+        (
+            "index",
+            LOOKUPS,
+            new_deque,
+            lambda dq: [dq.index(entries[i]) for i in picks],
+            new_indexed,
+            lambda iq: [iq.index(entries[i]) for i in picks],
+        ),
+        (
+            "remove song",
+            LOOKUPS,
+            new_deque,
+            lambda dq: [dq.remove(entries[i]) for i in set(picks)],
+            new_indexed,
+            lambda iq: [iq.remove(entries[i]) for i in set(picks)],
+        ),
+        (
+            "remove at",
+            LOOKUPS,
+            new_deque,
+            deque_remove_at,
+            new_indexed,
+            lambda iq: [iq.remove_at(i) for i in removals],
+        ),
+        (
+            "time before",
+            LOOKUPS,
+            new_deque,
+            lambda dq: [sum(e.duration_ms for e in list(dq)[:i]) for i in picks],
+            new_indexed,
+            lambda iq: [iq.weight_before(i) for i in picks],
+        ),
+    ]
+    for name, index in (("insert pages, front", 1), ("insert pages, middle", size // 2)):
+        cases.append(
+            (
+                name,
+                PAGES * PAGE_SIZE,
+                lambda: (new_deque(), _pages()),
+                deque_insert_pages(index),
+                lambda: (new_indexed(), _pages()),
+                indexed_insert_pages(index),
+            )
+        )
+
+    rows = []
+    for name, count, deque_setup, with_deque, indexed_setup, with_indexed in cases:
+        deque_time = best_of(with_deque, repeat=3, setup=deque_setup)
+        indexed_time = best_of(with_indexed, repeat=3, setup=indexed_setup)
+        rows.append(
+            [
+                str(size),
+                name,
+                str(count),
+                ms(deque_time),
+                ms(indexed_time),
+                f"{deque_time / indexed_time:.1f}x",
+            ]
+        )
+    return rows
+
+
+def main() -> None:
+    rows = []
+    for size in SIZES:
+        rows.extend(run(size))
+    print_table(["songs", "operation", "count", "deque", "IndexedQueue", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
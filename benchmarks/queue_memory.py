@@ -0,0 +1,112 @@
+"""
+Memory of the queued song metadata, 100 guilds with 2,000 songs each, measured with
+tracemalloc: the entries as they were before (a `commands.Context` per entry, the
+duration as a "H:MM:SS" string, strings not shared) against `SongMeta` now
+(requester ID, integer milliseconds, interned title, author and playlist name).
+
+The guilds queue songs from a catalogue of 20,000 tracks, so popular titles repeat
+across guilds. Every string is built anew, as when it is decoded from a provider
+response. Each guild filled its queue with 20 commands of 100 songs. Their
+contexts are empty stand-ins here: the real ones also keep the message, the
+interaction, the author and the channel alive, so only their number is reported.
+
+    python -m benchmarks.queue_memory
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, List, Optional
+
+from benchmarks.common import allocations_of, mib, print_table
+from cogs.music.core.song import YouTubeSongMeta
+
+GUILDS = 100
+SONGS = 2000
+CATALOGUE = 20000
+COMMANDS = 20
+
+
+@dataclass(slots=True)
+class LegacySongMeta:
+    """`YouTubeSongMeta` before: the fields of the queue and the command context."""
+
+    title: Optional[str]
+    duration: str
+    playlist_name: Optional[str]
+    webpage_url: Optional[str]
+    author: Optional[str]
+    ctx: Any
+    video_id: str
+
+
+class Context:
+    """Stands for the `commands.Context` of the command that queued a song."""
+
+
+def _picks() -> List[List[int]]:
+    rng = random.Random(0)
+    # A few tracks are queued far more often than the others.
+    weights = [1 / (rank + 1) for rank in range(CATALOGUE)]
+    return [rng.choices(range(CATALOGUE), weights, k=SONGS) for _ in range(GUILDS)]
+
+
+def _legacy(picks: List[List[int]]) -> List[List[LegacySongMeta]]:
+    guilds = []
+    for tracks in picks:
+        contexts = [Context() for _ in range(COMMANDS)]
+        guilds.append(
+            [
+                LegacySongMeta(
+                    title=f"Track title {track}",
+                    duration=str(timedelta(seconds=180 + track % 240)),
+                    playlist_name=f"Playlist {i // (SONGS // COMMANDS)}",
+                    webpage_url=f"https://www.youtube.com/watch?v={track:011d}",
+                    author=f"Channel {track % 3000}",
+                    ctx=contexts[i * COMMANDS // SONGS],
+                    video_id=f"{track:011d}",
+                )
+                for i, track in enumerate(tracks)
+            ]
+        )
+    return guilds
+
+
+def _compact(picks: List[List[int]]) -> List[List[YouTubeSongMeta]]:
+    guilds = []
+    for guild, tracks in enumerate(picks):
+        guilds.append(
+            [
+                YouTubeSongMeta(
+                    title=f"Track title {track}",
+                    duration_ms=(180 + track % 240) * 1000,
+                    playlist_name=f"Playlist {i // (SONGS // COMMANDS)}",
+                    webpage_url=f"https://www.youtube.com/watch?v={track:011d}",
+                    author=f"Channel {track % 3000}",
+                    requester_id=guild * COMMANDS + i * COMMANDS // SONGS,
+                    video_id=f"{track:011d}",
+                )
+                for i, track in enumerate(tracks)
+            ]
+        )
+    return guilds
+
+
+def main() -> None:
+    picks = _picks()
+    entries = GUILDS * SONGS
+    rows = []
+    for name, build, contexts in (
+        ("before (context per entry)", _legacy, GUILDS * COMMANDS),
+        ("SongMeta (requester ID)", _compact, 0),
+    ):
+        _, retained, peak = allocations_of(lambda: build(picks))
+        rows.append(
+            [name, mib(retained), f"{retained / entries:.0f} B", mib(peak), str(contexts)]
+        )
+    print(f"{GUILDS} guilds x {SONGS} queued songs")
+    print_table(["entries", "retained", "per entry", "peak", "contexts kept alive"], rows)
+
+
+if __name__ == "__main__":
+    main()
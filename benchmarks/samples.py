@@ -0,0 +1,132 @@
+"""
+Synthetic Spotify Web API documents, shaped like the real responses: every field
+the models read plus the ones they skip (markets, external IDs...).
+"""
+
+from typing import Any, Dict, List
+
+# The markets listed by a track available worldwide, as in real responses.
+MARKETS = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(185)]
+
+
+def _urls(kind: str, id: str) -> Dict[str, Any]:
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/{kind}/{id}"},
+        "href": f"https://api.spotify.com/v1/{kind}s/{id}",
+        "id": id,
+        "type": kind,
+        "uri": f"spotify:{kind}:{id}",
+    }
+
+
+def artist(i: int) -> Dict[str, Any]:
+    return {**_urls("artist", f"artist{i:018d}"), "name": f"Artist {i}"}
+
+
+def album(i: int) -> Dict[str, Any]:
+    return {
+        **_urls("album", f"album{i:019d}"),
+        "album_type": "album",
+        "artists": [artist(i % 300)],
+        "available_markets": MARKETS,
+        "images": [
+            {"url": f"https://i.scdn.co/image/{i:040d}{size}", "width": size, "height": size}
+            for size in (640, 300, 64)
+        ],
+        "is_playable": True,
+        "name": f"Album {i}",
+        "release_date": "2020-01-01",
+        "release_date_precision": "day",
+        "total_tracks": 12,
+    }
+
+
+def track(i: int) -> Dict[str, Any]:
+    """A track, as returned by the `tracks` endpoint."""
+    return {
+        **_urls("track", f"track{i:017d}"),
+        "album": album(i // 10),
+        "artists": [artist(i % 300), artist((i + 1) % 300)],
+        "available_markets": MARKETS,
+        "disc_number": 1,
+        "duration_ms": 180_000 + i,
+        "explicit": False,
+        "external_ids": {"isrc": f"US{i:010d}"},
+        "is_local": False,
+        "is_playable": True,
+        "name": f"Track {i}",
+        "popularity": 50,
+        "preview_url": None,
+        "track_number": i % 12 + 1,
+        "episode": False,
+        "track": True,
+    }
+
+
+def playlist(size: int) -> Dict[str, Any]:
+    """A playlist with all of its `size` tracks read, as one document."""
+    items = [
+        {
+            "added_at": "2024-01-01T00:00:00Z",
+            "added_by": {"id": "owner", "type": "user", "uri": "spotify:user:owner"},
+            "is_local": False,
+            "primary_color": None,
+            "track": track(i),
+            "video_thumbnail": {"url": None},
+        }
+        for i in range(size)
+    ]
+    return {
+        **_urls("playlist", "playlist0000000000000"),
+        "collaborative": False,
+        "description": "A synthetic playlist.",
+        "followers": {"href": None, "total": 1000},
+        "images": [{"url": "https://i.scdn.co/image/playlist", "width": 640, "height": 640}],
+        "name": "Playlist",
+        "owner": {**_urls("user", "owner"), "display_name": "Owner"},
+        "primary_color": "#ffffff",
+        "public": True,
+        "snapshot_id": "snapshot",
+        "tracks": {
+            "href": "https://api.spotify.com/v1/playlists/playlist0000000000000/tracks",
+            "items": items,
+            "limit": size,
+            "next": None,
+            "offset": 0,
+            "previous": None,
+            "total": size,
+        },
+    }
+
+
+def project_playlist(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What the Web API returns for `data` with the `fields` filter of
+    `compact.PLAYLIST_FIELDS`.
+    """
+    items: List[Dict[str, Any]] = []
+    for item in data["tracks"]["items"]:
+        t = item["track"]
+        items.append(
+            {
+                "track": {
+                    "id": t["id"],
+                    "name": t["name"],
+                    "duration_ms": t["duration_ms"],
+                    "artists": [{"name": a["name"]} for a in t["artists"]],
+                    "external_urls": {"spotify": t["external_urls"]["spotify"]},
+                }
+            }
+        )
+    tracks = data["tracks"]
+    return {
+        "id": data["id"],
+        "name": data["name"],
+        "type": data["type"],
+        "tracks": {
+            "items": items,
+            "next": tracks["next"],
+            "offset": tracks["offset"],
+            "total": tracks["total"],
+        },
+    }
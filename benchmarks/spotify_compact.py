@@ -0,0 +1,61 @@
+"""
+Importing a Spotify playlist into the queue: the full `playlist.Playlist` models
+against the `compact` records, CPU time and memory per imported playlist.
+
+The full path parses the whole API document and decodes every model. The compact
+path parses the document the Web API returns with the `fields` filter of
+`compact.PLAYLIST_FIELDS`, and decodes `CompactCollection`. Both documents are
+synthetic, see `benchmarks.samples`.
+
+    python -m benchmarks.spotify_compact
+"""
+
+import json
+
+from benchmarks import samples
+from benchmarks.common import allocations_of, cpu_of, mib, ms, print_table
+from cogs.music.services.spotify import playlist
+from cogs.music.services.spotify.compact import CompactCollection
+
+TRACKS = 1000
+
+
+def main() -> None:
+    full = samples.playlist(TRACKS)
+    full_body = json.dumps(full).encode()
+    compact_body = json.dumps(samples.project_playlist(full)).encode()
+
+    rows = []
+    for name, body, decode in (
+        ("full models", full_body, playlist.Playlist.from_dict),
+        ("compact records", compact_body, CompactCollection.from_dict),
+    ):
+        parse_time = cpu_of(lambda: json.loads(body))
+        data = json.loads(body)
+        decode_time = cpu_of(lambda: decode(data))
+        _, retained, peak = allocations_of(lambda: decode(json.loads(body)))
+        rows.append(
+            [
+                name,
+                f"{len(body) / 1024:,.0f} KiB",
+                ms(parse_time),
+                ms(decode_time),
+                mib(retained),
+                mib(peak),
+            ]
+        )
+
+    tracks = CompactCollection.from_dict(json.loads(compact_body)).tracks.items
+    assert [t.id for t in tracks] == [
+        t.track.id for t in playlist.Playlist.from_dict(full).tracks.items
+    ]
+
+    print(f"Playlist of {TRACKS} tracks")
+    print_table(
+        ["path", "response", "json.loads CPU", "decode CPU", "retained", "peak"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,13 @@ from discord.ext import commands
 
 from cogs.admin.admin import Admin
 from cogs.greetings import Greeting
+from cogs.music.core.snapshot import SnapshotStore
 from cogs.music.manager import PlayerManager
 from cogs.music.music import Music
 from cogs.tts.tts import TTS
 from core.error_handler import ErrorHandler
 from utils import cleanup, get_env, setup_logger
+from utils.http import HttpClient
 
 _log = logging.getLogger(name=__name__)
 
@@ -25,6 +27,11 @@ class Bot(commands.Bot):
 
     async def setup_hook(self) -> None:
         self.tree.error(self.error_handler.handle_interaction_error)
+        await SnapshotStore().load()
+
+    async def close(self) -> None:
+        await super().close()
+        await HttpClient().close()
 
     async def on_command_error(self, ctx: commands.Context, error: Exception) -> None:
         await self.error_handler.handle_command_error(ctx, error)
@@ -12,7 +12,10 @@ class Admin(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def shutdown(self, interaction: discord.Interaction) -> None:
         for player in PlayerManager().players.values():
-            player.destroy()
+            # Save the queues as they are now, they are restored after the restart.
+            if player.playlist_manager.snapshots is not None:
+                await player.playlist_manager.snapshots.flush()
+            player.destroy(keep_snapshot=True)
             del player
 
         ctx = await self.bot.get_context(interaction)
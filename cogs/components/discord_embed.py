@@ -4,6 +4,7 @@ import discord
 from discord.ext import commands
 
 from cogs.music.core.song import Song, SongMeta
+from utils import format_duration
 
 
 class Embed:
@@ -16,6 +17,19 @@ class Embed:
     def help(self) -> None:
         pass
 
+    def _set_requester_footer(self, requester_id: int) -> None:
+        """Set the footer to the user who requested a song, looked up by ID."""
+        user = None
+        if self.ctx is not None:
+            if self.ctx.guild is not None:
+                user = self.ctx.guild.get_member(requester_id)
+            if user is None:
+                user = self.ctx.bot.get_user(requester_id)
+        self.embed.set_footer(
+            text=f"Requested by {user.name if user else 'Unknown user'}",
+            icon_url=user.display_avatar.url if user else None,
+        )
+
     def normal(self, title=None, color=None, description=None) -> discord.Embed:
         self.embed.title = title
         self.embed.color = color
@@ -36,17 +50,14 @@ class Embed:
         [{song.title}]({song.webpage_url})
         Uploader: {song.uploader}
         Playback counts: {song.playback_count}
-        Duration: {song.duration}
+        Duration: {format_duration(song.duration_ms, unit="milliseconds")}
         Upload date: {song.upload_date}
         """
         if song.album is not None:
             self.embed.description += f"Album: {song.album.title}"
 
         self.embed.set_thumbnail(url=song.thumbnail)
-        self.embed.set_footer(
-            text=f"Requested by {self.ctx.author.name}",
-            icon_url=self.ctx.author.avatar.url if self.ctx.author.avatar else None,
-        )
+        self._set_requester_footer(song.requester_id)
         return self.embed
 
     def in_playlist(self, playlist: List[SongMeta]) -> discord.Embed:
@@ -64,18 +75,23 @@ class Embed:
         )
         return self.embed
 
-    def add_song(self, song, position: int, timewait: str) -> discord.Embed:
+    def add_song(self, song, position: int, timewait_ms: int) -> discord.Embed:
         self.embed.title = "Song added"
         self.embed.color = discord.Color.orange()
         self.embed.description = f"""
         Song: [{song.title}]({song.webpage_url})
         Position in playlist: {position}
-        Estimate time to this song: {timewait}
+        Estimate time to this song: {format_duration(timewait_ms, unit="milliseconds")}
         """
-        self.embed.set_footer(
-            text=f"Requested by {self.ctx.author.name}",
-            icon_url=self.ctx.author.avatar.url if self.ctx.author.avatar else None,
-        )
+        self._set_requester_footer(song.requester_id)
+        return self.embed
+
+    def playlist_progress(self, count: int, done: bool, skipped: int = 0) -> discord.Embed:
+        self.embed.title = "Playlist added" if done else "Loading playlist..."
+        self.embed.color = discord.Color.green() if done else discord.Color.orange()
+        self.embed.description = f"{count} song(s) added to the playlist."
+        if skipped:
+            self.embed.description += f"\n{skipped} song(s) already in the playlist were skipped."
         return self.embed
 
     def error(self, description: str, title: str | None = None) -> discord.Embed:
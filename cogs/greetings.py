@@ -1,9 +1,9 @@
 import discord
-import requests
 import speedtest
 from bs4 import BeautifulSoup
 from discord.ext import commands
 from discord import app_commands
+from utils.http import HttpClient
 
 
 class Greeting(commands.Cog):
@@ -109,10 +109,10 @@ class Greeting(commands.Cog):
         NameCurrency = []
         InverseConversion = []
 
-        def get_data():
+        async def get_data():
             url = f"https://vn.exchange-rates.org/converter/{currency_from.upper()}/{currency_to.upper()}/{amount}/Y"
-            response = requests.get(url)
-            soup = BeautifulSoup(response.content, "html.parser")
+            content = await HttpClient().get_text(url)
+            soup = BeautifulSoup(content, "html.parser")
             for i in range(1, 3):
                 data = soup.findAll("div", class_=f"col-xs-6 result-cur{i}")
                 for information in data:
@@ -120,7 +120,7 @@ class Greeting(commands.Cog):
                     NameCurrency.append(information.find("dd").text)
                     InverseConversion.append(information.find("small").text)
 
-        get_data()
+        await get_data()
         nl = "\n"
         await ctx.send(
             f"{AmountFromAndTo[0]} {NameCurrency[0].replace(nl,'')} = {AmountFromAndTo[1]} {NameCurrency[1].replace(nl,'')}"
@@ -148,8 +148,9 @@ class Greeting(commands.Cog):
     @app_commands.command(name="dogimg", description="Get a random dog image.")
     async def dogimg(self, interaction: discord.Interaction):
         ctx = await self.bot.get_context(interaction)
-        img = requests.get("https://dog.ceo/api/breeds/image/random").json()
-        fact = requests.get("https://some-random-api.ml/facts/dog").json()
+        http = HttpClient()
+        img = await http.get_json("https://dog.ceo/api/breeds/image/random")
+        fact = await http.get_json("https://some-random-api.ml/facts/dog")
         embed = discord.Embed(title="Dog", color=discord.Color.purple())  # Create embed
         embed.set_image(url=img["message"])
         embed.set_footer(text="Fact: " + fact["fact"])
@@ -158,8 +159,9 @@ class Greeting(commands.Cog):
     @app_commands.command(name="catimg", description="Get a random cat image.")
     async def catimg(self, interaction: discord.Interaction):
         ctx = await self.bot.get_context(interaction)
-        img = requests.get("https://some-random-api.ml/img/cat").json()
-        fact = requests.get("https://some-random-api.ml/facts/cat").json()
+        http = HttpClient()
+        img = await http.get_json("https://some-random-api.ml/img/cat")
+        fact = await http.get_json("https://some-random-api.ml/facts/cat")
         embed = discord.Embed(title="Cat", color=discord.Color.purple())  # Create embed
         embed.set_image(url=img["link"])
         embed.set_footer(text="Fact: " + fact["fact"])
@@ -168,7 +170,7 @@ class Greeting(commands.Cog):
     @app_commands.command(name="meme", description="Get a random meme.")
     async def meme(self, interaction: discord.Interaction):
         ctx = await self.bot.get_context(interaction)
-        getMeme = requests.get("https://some-random-api.ml/meme").json()
+        getMeme = await HttpClient().get_json("https://some-random-api.ml/meme")
         image = getMeme["image"]
         caption = getMeme["caption"]
         embed = discord.Embed(
@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
-from typing import List, Optional, Union, Literal
+from typing import AsyncIterator, Callable, List, Optional, Union, Literal
 
 from cogs.music.manager import PlayerManager, PlaylistManager
 from cogs.music.core.song import Song, SongMeta
@@ -14,16 +14,49 @@ from cogs.components.discord_embed import Embed
 from cogs.music.core.playlist import PlaylistObserver
 from cogs.music.search import Search
 from discord.ext import commands
-from utils import Timer, convert_to_second, get_time
+from utils import Timer
+from utils.metrics import Histogram
 
 _log = logging.getLogger(__name__)
 
+# Time from `after_play` of a song to the first audio packet of the next one.
+PLAYBACK_GAP = Histogram("playback_gap_seconds")
+
+
+class MeasuredSource(discord.AudioSource):
+    """
+    Wraps an audio source and calls `on_first_packet` when the first packet is read.
+
+    `read` runs on the audio player thread, so the callback must be thread-safe.
+    """
+
+    def __init__(
+        self, original: discord.AudioSource, on_first_packet: Callable[[], None]
+    ) -> None:
+        self.original = original
+        self._on_first_packet: Optional[Callable[[], None]] = on_first_packet
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        if self._on_first_packet is not None:
+            callback, self._on_first_packet = self._on_first_packet, None
+            callback()
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self) -> None:
+        self.original.cleanup()
+
 
 class Audio:
     def __init__(self, *args, **kwargs) -> None:
         self.bot = None
-        self.playlist_manager = PlaylistManager()
+        self.playlist_manager = PlaylistManager(guild_id=kwargs.get("guild_id"))
         self.is_playing = False
+        # perf_counter() of the last `after_play`, used to measure the playback gap.
+        self.song_ended_at: Optional[float] = None
 
         self.ctx: Optional[commands.Context] = None
         self.timer = Timer(callback=self.timeout_handle, ctx=self.ctx)
@@ -47,9 +80,23 @@ class Audio:
         if not self.playlist_manager.playlist._observers:
             raise Warning("Missing playlist observers.")
 
-    def destroy(self) -> None:
+    def destroy(self, keep_snapshot: bool = False) -> None:
+        """
+        Stops the player: clears the playlist and cancels the idle timer.
+
+        Args:
+            keep_snapshot (bool): Keep the saved snapshot of the queue so it is restored
+                after a restart. Otherwise the snapshot is deleted.
+        """
+        snapshots = self.playlist_manager.snapshots
+        self.playlist_manager.playlist.on_change = None
         self.playlist_manager.playlist.clear()
         self.timer.cancel()
+        if snapshots is not None:
+            if keep_snapshot:
+                snapshots.cancel()
+            else:
+                asyncio.create_task(snapshots.delete())
 
     async def play_next(self, ctx: Optional[commands.Context] = None) -> None:
         """
@@ -74,6 +121,7 @@ class Audio:
                 )
                 if song is None:
                     self.current_song = None
+                    self.playlist_manager.save_snapshot()
                     if ctx is not None:
                         await ctx.send(embed=Embed().end_playlist())
                 else:
@@ -96,6 +144,7 @@ class Audio:
             None
         """
         if ctx.voice_client and not ctx.voice_client.is_playing():
+            self.song_ended_at = time.perf_counter()
             self.is_playing = not self.is_playing
             self.playlist_manager.prev_song = self.playlist_manager.current_song
             self.playlist_manager.current_song = None
@@ -109,9 +158,13 @@ class Audio:
         Returns:
             None
         """
-        ctx = song.context
-        self.playlist_manager.current_song_start_time = convert_to_second(get_time())
-        self.playlist_manager.current_song_duration = convert_to_second(song.duration)
+        # Songs only keep the requester ID, messages go to the latest command context.
+        ctx = self.ctx
+        # A restored song resumes at `start_ms`, count it as already played.
+        self.playlist_manager.current_song_start_time = (
+            time.monotonic() - song.start_ms / 1000
+        )
+        self.playlist_manager.current_song_duration_ms = song.duration_ms
 
         self.timer.cancel()
         self.timer = Timer(self.timeout_handle, ctx=ctx)
@@ -123,40 +176,160 @@ class Audio:
             self.after_play(self.bot, ctx)
             return
 
-        source = discord.FFmpegPCMAudio(song.playback_url, **constants.FFMPEG_OPTIONS)  # type: ignore
+        source = MeasuredSource(
+            await self._create_source(song), self._record_playback_gap
+        )
         embed = Embed(ctx).now_playing_song(song)
-        await ctx.reply(embed=embed)
+        await ctx.send(embed=embed)
 
         self.playlist_manager.current_song = song
+        self.playlist_manager.save_snapshot()
         ctx.voice_client.play(source, after=lambda x: self.after_play(self.bot, ctx))
 
+    async def _create_source(self, song: Song) -> discord.AudioSource:
+        """
+        Creates the audio source for a song.
+
+        Opus audio (YouTube itag 251, SoundCloud opus transcodings) is passed through
+        to Discord without decoding it, so neither FFmpeg nor discord.py has to encode
+        it again. The codec recorded on the song is used when known, otherwise the
+        playback URL is probed. Other codecs are transcoded to PCM as before.
+
+        Args:
+            song (Song): The song to play. `song.playback_url` must be set.
+
+        Returns:
+            discord.AudioSource: The audio source.
+        """
+        options = dict(constants.FFMPEG_OPTIONS)
+        if song.start_ms:
+            # Seek the input, used to resume a song restored from a snapshot.
+            options["before_options"] += f" -ss {song.start_ms / 1000:.3f}"
+
+        codec, bitrate = song.codec, None
+        if constants.OPUS_PASSTHROUGH and codec is None:
+            # `probe` returns (None, None) if both probe methods fail.
+            codec, bitrate = await discord.FFmpegOpusAudio.probe(song.playback_url)  # type: ignore
+
+        if constants.OPUS_PASSTHROUGH and codec == "opus":
+            _log.debug(f"Passing through opus audio for '{song.title}'.")
+            return discord.FFmpegOpusAudio(
+                song.playback_url,  # type: ignore
+                codec="copy",
+                bitrate=bitrate,
+                **options,
+            )
+
+        _log.debug(f"Transcoding {codec or 'unknown'} audio for '{song.title}'.")
+        return discord.FFmpegPCMAudio(song.playback_url, **options)  # type: ignore
+
+    def _record_playback_gap(self) -> None:
+        """
+        Records the time between the end of the previous song and the first audio
+        packet of the current one. Called from the audio player thread.
+        """
+        ended_at, self.song_ended_at = self.song_ended_at, None
+        if ended_at is None:
+            return
+        gap = time.perf_counter() - ended_at
+        PLAYBACK_GAP.observe(gap)
+        stats = PLAYBACK_GAP.snapshot()
+        _log.info(
+            f"Playback gap: {gap:.3f}s (mean {stats['mean']:.3f}s over {stats['count']} song(s))."
+        )
+
     async def process_query(
-        self, ctx: commands.Context, query: str, priority: bool = False
+        self,
+        ctx: commands.Context,
+        query: str,
+        priority: bool = False,
+        skip_duplicates: bool = False,
     ) -> None:
+        """
+        Queues the songs of a query.
+
+        Playlists are queued page by page as they are read, so playback starts after
+        the first page. The first song gets the usual "song added" message, the
+        following pages update a progress message in place.
+
+        With `skip_duplicates`, songs that are already queued are left out. If that
+        leaves nothing to add, the user is told where the song is queued.
+        """
         # assign this context for timeout_handler can work.
         self.ctx = ctx
 
         start_time = time.time()
-        songs = await self._search_songs(query, priority)
-
-        if songs:
-            await self.playlist_manager.add_songs(songs, priority)
-            self._log_song_addition(len(songs), ctx.guild.id, query, start_time)
-            await self._send_song_added_message(songs[0], priority)
+        pages = Search().iter_query(query, ctx)
+        added = 0
+        skipped: List[SongMeta] = []
+        last_song: Optional[SongMeta] = None
+        progress: Optional[discord.Message] = None
+        try:
+            while True:
+                try:
+                    songs = await self._next_page(pages)
+                except StopAsyncIteration:
+                    break
+                # Keep the pages in order when they are queued to play next.
+                queued = await self.playlist_manager.add_songs(
+                    songs, priority, after=last_song, skip_duplicates=skip_duplicates
+                )
+                if len(queued) < len(songs):
+                    queued_ids = {id(song) for song in queued}
+                    skipped.extend(s for s in songs if id(s) not in queued_ids)
+                if not queued:
+                    continue
+                added += len(queued)
+                if last_song is None:
+                    await self._send_song_added_message(queued[0], priority)
+                else:
+                    progress = await self._send_progress_message(
+                        progress, added, skipped=len(skipped)
+                    )
+                last_song = queued[-1]
+        except asyncio.TimeoutError:
+            await self._send_query_timeout_message()
+            if added == 0:
+                return
+        finally:
+            await pages.aclose()
+
+        if added:
+            self._log_song_addition(added, ctx.guild.id, query, start_time)
+            if progress is not None or skipped:
+                await self._send_progress_message(
+                    progress, added, done=True, skipped=len(skipped)
+                )
+        elif skipped:
+            await self._send_already_queued_message(skipped)
         else:
             await self._send_no_songs_found_message()
 
+    async def _next_page(self, pages: AsyncIterator[List[SongMeta]]) -> List[SongMeta]:
+        """
+        Waits for the next page of a query, giving up after `QUERY_TIMEOUT` seconds.
+
+        Raises:
+            StopAsyncIteration: There are no more pages.
+            asyncio.TimeoutError: The page took too long.
+        """
+        return await asyncio.wait_for(anext(pages), timeout=constants.QUERY_TIMEOUT)
+
     async def process_search(
         self,
         ctx: commands.Context,
         query: str,
-        provider: Optional[Literal["youtube", "soundcloud"]] = None,
+        provider: Optional[Literal["youtube", "soundcloud", "spotify", "all"]] = None,
     ) -> None:
         self.ctx = ctx
 
-        songs: Optional[List[SongMeta]] = await self._search_songs(
-            query, provider=provider, limit=10
-        )
+        try:
+            songs: Optional[List[SongMeta]] = await self._search_songs(
+                query, provider=provider, limit=10
+            )
+        except asyncio.TimeoutError:
+            await self._send_query_timeout_message()
+            return
         if songs:
             view = MusicView(songs, self.handle_track_selection_in_search)
             view.message = await ctx.send(embed=view.create_embed(), view=view)
@@ -206,11 +379,22 @@ class Audio:
     async def _search_songs(
         self,
         query: str,
-        priority: bool = False,
-        provider: Optional[Literal["youtube", "soundcloud"]] = None,
+        provider: Optional[Literal["youtube", "soundcloud", "spotify", "all"]] = None,
         limit: int = 1,
     ) -> Optional[List[SongMeta]]:
-        return await Search().query(query, self.ctx, priority, provider, limit)
+        """
+        Searches for songs, giving up after `QUERY_TIMEOUT` seconds.
+
+        On timeout the search is cancelled, including provider calls that are still
+        waiting for a worker.
+
+        Raises:
+            asyncio.TimeoutError: The search took too long.
+        """
+        return await asyncio.wait_for(
+            Search().query(query, self.ctx, provider, limit),
+            timeout=constants.QUERY_TIMEOUT,
+        )
 
     def _log_song_addition(
         self, song_count: int, guild_id: int, query: str, start_time: float
@@ -229,9 +413,39 @@ class Audio:
         if embed is not None:
             await self.ctx.send(embed=embed)
 
+    async def _send_progress_message(
+        self,
+        message: Optional[discord.Message],
+        count: int,
+        done: bool = False,
+        skipped: int = 0,
+    ) -> discord.Message:
+        """Sends the playlist loading progress, or edits it in place if it was sent."""
+        embed = Embed(self.ctx).playlist_progress(count, done, skipped)
+        if message is None:
+            return await self.ctx.send(embed=embed)
+        await message.edit(embed=embed)
+        return message
+
+    async def _send_already_queued_message(self, songs: List[SongMeta]) -> None:
+        index = self.playlist_manager.playlist.find(songs[0])
+        if len(songs) > 1:
+            description = f"All {len(songs)} songs are already in the playlist."
+        elif index is not None:
+            description = f"**{songs[0].title}** is already in the playlist at position {index + 1}."
+        else:
+            description = f"**{songs[0].title}** is already in the playlist."
+        await self.ctx.send(embed=Embed().error(description))
+
     async def _send_no_songs_found_message(self) -> None:
         await self.ctx.send(embed=Embed().error("No songs were found!"))
 
+    async def _send_query_timeout_message(self) -> None:
+        _log.warning(f"Query timed out after {constants.QUERY_TIMEOUT} seconds.")
+        await self.ctx.send(
+            embed=Embed().error("This query took too long. Please try again.")
+        )
+
     async def timeout_handle(self, ctx: Union[commands.Context, None]) -> None:
         """
         Handles the timeout for the voice client in a Discord server.
@@ -256,6 +470,7 @@ class Audio:
             )
         else:
             playerManager = PlayerManager()
+            self.destroy()
             del playerManager.players[ctx.message.guild.id]
             await ctx.voice_client.disconnect()
             await ctx.send(
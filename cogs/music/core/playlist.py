@@ -1,19 +1,19 @@
 import asyncio
 import logging
-from collections import deque
-from typing import Deque, List, Optional, TYPE_CHECKING
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 
 from cogs.music.core.song import (
     Song,
     SongMeta,
     SoundCloudSongMeta,
+    SpotifySongMeta,
     YouTubeSongMeta,
-    createSong,
     get_songs_info,
 )
+from cogs.music.core.prefetch import Prefetcher
+from cogs.music.core.queue import IndexedQueue
 from core.exceptions import MusicException
 from patterns.observe import Observable, Observer
-from utils import convert_to_second, convert_to_time
 
 if TYPE_CHECKING:
     from cogs.music.controller import Audio
@@ -24,8 +24,71 @@ _logger = logging.getLogger(__name__)
 class PlayList(Observable):
     def __init__(self) -> None:
         super().__init__()
-        self._q: Deque[SongMeta] = deque()
+        self._q: IndexedQueue[SongMeta] = IndexedQueue()
         self.lock: asyncio.Lock = asyncio.Lock()
+        self._prefetcher = Prefetcher()
+        # The song taken from the queue last, i.e. the one playing.
+        self.current: Optional[SongMeta] = None
+        # Called after every change of the queue, e.g. to save a snapshot.
+        self.on_change: Optional[Callable[[], None]] = None
+        # Incremented on every change, lets readers of `window` detect changes.
+        self.version: int = 0
+        # The queued songs by (provider, id), to find duplicates without a scan.
+        self._by_identity: Dict[Tuple[str, Union[str, int]], List[SongMeta]] = {}
+
+    def _changed(self) -> None:
+        self.version += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def _index_add(self, songs: Iterable[SongMeta]) -> None:
+        for song in songs:
+            self._by_identity.setdefault(song.identity(), []).append(song)
+
+    def _index_remove(self, song: Optional[SongMeta]) -> None:
+        if song is None:
+            return
+        key = song.identity()
+        entries = [entry for entry in self._by_identity.get(key, ()) if entry is not song]
+        if entries:
+            self._by_identity[key] = entries
+        else:
+            self._by_identity.pop(key, None)
+
+    def find(self, song: SongMeta) -> Optional[int]:
+        """
+        Get the index of the first queued song that is the same song as `song`
+        (same provider and ID), even if it was requested separately.
+
+        Args:
+            song (SongMeta): The song to look for.
+
+        Returns:
+            int | None: The index, or None if the song is not queued.
+        """
+        entries = self._by_identity.get(song.identity())
+        if not entries:
+            return None
+        return min(self._q.index(entry) for entry in entries)  # type: ignore
+
+    def __contains__(self, song: SongMeta) -> bool:
+        return song in self._q
+
+    def __iter__(self) -> Iterator[SongMeta]:
+        return iter(self._q)
+
+    def restore(self, songs: List[SongMeta]) -> None:
+        """
+        Put back songs restored from a snapshot, at the end of the queue. Observers
+        are not notified, so nothing plays until a song is requested again, and the
+        songs are resolved when they get near the head of the queue.
+
+        Args:
+            songs (List[SongMeta]): The songs, in order.
+        """
+        self._q.extend(songs, [song.duration_ms for song in songs])
+        self._index_add(songs)
+        self.version += 1
 
     async def add(self, song: SongMeta) -> None:
         """
@@ -38,7 +101,10 @@ class PlayList(Observable):
             None
         """
         async with self.lock:
-            self._q.append(song)
+            self._q.append(song, song.duration_ms)
+            self._index_add((song,))
+            self._prefetcher.sync(self._q)
+            self._changed()
             await self.notify()
 
     async def add_next(self, song: SongMeta) -> None:
@@ -52,8 +118,65 @@ class PlayList(Observable):
             None
         """
         async with self.lock:
-            self._q.appendleft(song)
+            self._q.appendleft(song, song.duration_ms)
+            self._index_add((song,))
+            self._prefetcher.sync(self._q)
+            self._changed()
+            await self.notify()
+
+    async def add_many(
+        self,
+        songs: List[SongMeta],
+        priority: bool = False,
+        after: Optional[SongMeta] = None,
+        skip_duplicates: bool = False,
+    ) -> List[SongMeta]:
+        """
+        Adds a batch of songs to the playlist queue at once and notifies any waiting
+        coroutines a single time.
+
+        The batch keeps its order: with `priority`, `songs[0]` becomes the next song
+        to play, otherwise the songs are played after the current queue, in order.
+
+        Args:
+            songs (List[SongMeta]): The song metadata to be added to the queue.
+            priority (bool): Add the songs to the front of the queue.
+            after (SongMeta | None): With `priority`, add the songs right after this
+                song if it is still queued. Used to keep the pages of a playlist
+                in order.
+            skip_duplicates (bool): Leave out the songs that are already queued, or
+                that appear earlier in the batch.
+
+        Returns:
+            List[SongMeta]: The songs that were added.
+        """
+        async with self.lock:
+            if skip_duplicates:
+                songs = self._without_duplicates(songs)
+            if not songs:
+                return songs
+            weights = [song.duration_ms for song in songs]
+            if priority:
+                index = self._q.index(after) if after is not None else None
+                self._q.insert_many(0 if index is None else index + 1, songs, weights)
+            else:
+                self._q.extend(songs, weights)
+            self._index_add(songs)
+            self._prefetcher.sync(self._q)
+            self._changed()
             await self.notify()
+        return songs
+
+    def _without_duplicates(self, songs: List[SongMeta]) -> List[SongMeta]:
+        kept = []
+        seen = set()
+        for song in songs:
+            key = song.identity()
+            if key in self._by_identity or key in seen:
+                continue
+            seen.add(key)
+            kept.append(song)
+        return kept
 
     def index(self, song: SongMeta) -> Optional[int]:
         """
@@ -65,10 +188,7 @@ class PlayList(Observable):
         Returns:
             int | None: The index of the song if found, otherwise None.
         """
-        try:
-            return self._q.index(song)
-        except ValueError:
-            return None
+        return self._q.index(song)
 
     def get_at(self, index: int) -> Optional[SongMeta]:
         """
@@ -80,10 +200,7 @@ class PlayList(Observable):
         Returns:
             SongMeta | None: The song at the specified index, or None if the index is out of range.
         """
-        try:
-            return self._q[index]
-        except IndexError:
-            return None
+        return self._q.get_at(index)
 
     async def remove_by_index(self, index: int) -> None:
         """
@@ -96,10 +213,9 @@ class PlayList(Observable):
             None
         """
         async with self.lock:
-            try:
-                self._q.remove(self._q[index])
-            except IndexError:
-                pass
+            self._index_remove(self._q.remove_at(index))
+            self._prefetcher.sync(self._q)
+            self._changed()
 
     async def remove_by_song(self, song: SongMeta) -> None:
         """
@@ -112,10 +228,10 @@ class PlayList(Observable):
             None
         """
         async with self.lock:
-            try:
-                self._q.remove(song)
-            except ValueError:
-                pass
+            if self._q.remove(song):
+                self._index_remove(song)
+            self._prefetcher.sync(self._q)
+            self._changed()
 
     def size(self) -> int:
         """
@@ -139,43 +255,43 @@ class PlayList(Observable):
         """
         Clears the playlist queue.
 
-        This method removes all items from the internal playlist queue.
+        This method removes all items from the internal playlist queue and cancels
+        any song that is being prefetched.
         """
         self._q.clear()
+        self._by_identity.clear()
+        self._prefetcher.clear()
+        self.current = None
+        self._changed()
 
-    def time_wait(self, to_song_index: int | None = None) -> str:
+    def time_wait(self, to_song_index: int | None = None) -> int:
         """
         Calculate the total duration of songs in the queue up to a specified index.
+        The durations are kept in a Fenwick tree, so this is O(log n).
         Args:
             to_song_index (int | None): The index up to which the total duration is calculated.
                                         If None, the total duration of all songs in the queue is calculated.
         Returns:
-            str: The total duration in a human-readable format (HH:MM:SS).
+            int: The total duration in milliseconds.
         """
 
-        if to_song_index is None:
-            to_song_index = len(self._q)
+        return int(self._q.weight_before(to_song_index))
 
-        sec = 0
-        for i in range(to_song_index):
-            sec += convert_to_second(time=self._q[i].duration)
+    def window(self, offset: int, limit: int) -> List[SongMeta]:
+        """
+        Get a page of the queue without copying the rest of it.
 
-        return convert_to_time(seconds=sec)
+        Compare `version` before and after to know whether the queue changed in
+        between.
 
-    async def get_list(self, limit: int | None = None) -> List[SongMeta]:
-        """
-        Retrieve a list of songs from the playlist.
         Args:
-            limit (int | None, optional): The maximum number of songs to retrieve.
-                                          If None, all songs in the playlist are returned. Defaults to None.
+            offset (int): The index of the first song.
+            limit (int): The maximum number of songs.
+
         Returns:
-            List[SongMeta]: A list of SongMeta objects representing the songs in the playlist.
+            List[SongMeta]: The songs from `offset`, at most `limit` of them.
         """
-
-        if limit is None:
-            return [song for song in self._q]
-        else:
-            return [song for song in list(self._q)[:limit]]
+        return self._q.window(offset, limit)
 
     def get_next(self) -> SongMeta | None:
         """Get the next song meta and remove it from queue
@@ -183,17 +299,18 @@ class PlayList(Observable):
         Returns:
             SongMeta | None
         """
-        try:
-            return self._q.popleft()
-        except IndexError:
-            return None
+        self.current = self._q.popleft()
+        self._index_remove(self.current)
+        self._changed()
+        return self.current
 
     async def get_next_prepared(self) -> Song | None:
         """
         Asynchronously retrieves the next prepared song.
         This method fetches the next song metadata using the `get_next` method.
-        If no metadata is available, it returns None. Otherwise, it attempts to
-        create a Song object from the metadata. If the creation fails and there
+        If no metadata is available, it returns None. Otherwise, it takes the Song
+        object prepared in the background by the prefetcher, or creates it from the
+        metadata if it was not prefetched. If the creation fails and there
         are more songs in the playlist, it recursively tries to get the next
         prepared song.
         Returns:
@@ -204,17 +321,23 @@ class PlayList(Observable):
         if song_meta is None:
             return None
 
-        song_obj = await createSong(song_meta)
+        prepared = self._prefetcher.take(song_meta)
+        self._prefetcher.sync(self._q)
+        song_obj = await prepared
         if song_obj is None:
             id = None
+            reason = f"The requested song '{song_meta.title}' may not be available."
             if isinstance(song_meta, YouTubeSongMeta):
                 id = song_meta.video_id
                 reason = (
-                    f"The requested YouTube song '{song_meta.title}' may not available"
+                    f"The requested YouTube song '{song_meta.title}' may not be available."
                 )
             elif isinstance(song_meta, SoundCloudSongMeta):
                 id = song_meta.track_id
                 reason = f"The requested SoundCloud song '{song_meta.title}' may not avaialable. Or the song ID is not correct."
+            elif isinstance(song_meta, SpotifySongMeta):
+                id = song_meta.track_id
+                reason = f"The requested Spotify song '{song_meta.title}' may not be available. No playable match was found on YouTube."
 
             _logger.error(
                 f"Failed to create song with type: {type(song_meta)}. Title: {song_meta.title}. ID: {id}. Reason: {reason}"
@@ -237,7 +360,7 @@ class PlayList(Observable):
         1. Logs the start of the update process.
         2. Collects songs that need metadata updates.
         3. Fetches updated metadata for the collected songs.
-        4. Applies the updated metadata to the songs in the queue.
+        4. Updates the durations of the songs in the queue.
         5. Logs the number of songs that were updated.
         Returns:
             None
@@ -254,9 +377,10 @@ class PlayList(Observable):
                 songs_need_to_update.append(None)
 
         songs_with_info = await get_songs_info(songs_need_to_update)
-        for song, song_with_info in zip(self._q, songs_with_info):
-            if song_with_info is not None:
-                song = song_with_info
+        for song in songs_with_info:
+            if song is not None:
+                # The duration is only known now for some songs (e.g. SoundCloud MiniTrack).
+                self._q.update_weight(song, song.duration_ms)
         _logger.debug(
             f"Updated {len([i for i in songs_with_info if i is not None])} song(s) meta info."
         )
@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+import logging
+from typing import Awaitable, Dict, Iterable, Optional, Tuple
+
+import constants
+from cogs.music.core.song import Song, SongMeta, createSong
+
+_logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Resolves the next few songs of a playlist in the background.
+
+    The playlist calls `sync` with its current queue after every change, so the set of
+    in-flight resolutions always follows the head of the queue: songs that move out of
+    the window (removed, pushed back by `add_next`) have their task cancelled, and songs
+    that move into it get a new one. `take` hands over the prepared `Song` for a song
+    meta that was just popped from the queue.
+    """
+
+    def __init__(self, size: int = constants.PREFETCH_SIZE) -> None:
+        self.size = size
+        # Keyed by id() because SongMeta dataclasses are not hashable. The meta itself
+        # is kept next to the task so the id cannot be reused while the entry exists.
+        self._tasks: Dict[int, Tuple[SongMeta, asyncio.Task[Optional[Song]]]] = {}
+
+    def sync(self, upcoming: Iterable[SongMeta]) -> None:
+        """
+        Align the in-flight resolutions with the first `size` songs of the queue.
+
+        Args:
+            upcoming (Iterable[SongMeta]): The queue, in play order.
+
+        Returns:
+            None
+        """
+        wanted = {id(meta): meta for meta in itertools.islice(upcoming, self.size)}
+
+        for key in list(self._tasks):
+            if key not in wanted:
+                _, task = self._tasks.pop(key)
+                task.cancel()
+
+        for key, meta in wanted.items():
+            if key not in self._tasks:
+                task = asyncio.create_task(createSong(meta))
+                task.add_done_callback(self._log_failure)
+                self._tasks[key] = (meta, task)
+
+    def take(self, song_meta: SongMeta) -> Awaitable[Optional[Song]]:
+        """
+        Detach the prepared song for a song meta that has just left the queue.
+
+        This must be called before the next `sync`, otherwise the resolution is
+        cancelled as the song is no longer in the queue. Falls back to resolving the
+        song directly if it was never prefetched.
+
+        Args:
+            song_meta (SongMeta): The song meta returned by `PlayList.get_next`.
+
+        Returns:
+            Awaitable[Song | None]: Resolves to the prepared song, or None if the song
+            is unavailable.
+        """
+        entry = self._tasks.pop(id(song_meta), None)
+        if entry is None or entry[0] is not song_meta:
+            return createSong(song_meta)
+
+        _logger.debug(
+            f"Prefetch {'hit' if entry[1].done() else 'pending'} for '{song_meta.title}'."
+        )
+        return entry[1]
+
+    def clear(self) -> None:
+        """Cancel every in-flight resolution."""
+        for _, task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        # Retrieve the exception so a discarded prefetch does not warn on garbage collection.
+        if not task.cancelled() and task.exception() is not None:
+            _logger.warning(f"Prefetching a song failed: {task.exception()!r}")
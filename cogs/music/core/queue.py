@@ -0,0 +1,355 @@
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_MIN_CAPACITY = 16
+
+
+class _Fenwick:
+    """Fenwick (binary indexed) tree of numbers over a fixed number of slots."""
+
+    __slots__ = ("tree",)
+
+    def __init__(self, values: List[float]) -> None:
+        # Linear-time build, the tree is 1-indexed.
+        tree = [0] + values
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, slot: int, delta: float) -> None:
+        i = slot + 1
+        tree = self.tree
+        size = len(tree)
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def add_block(self, slot: int, deltas: List[float]) -> None:
+        """
+        Add `deltas[i]` to slot `slot + i`, in O(k + log² n) for k deltas instead of
+        O(k log n): the nodes of the block are updated like in the linear-time build,
+        only the O(log n) ones whose parent is past the block go up the tree.
+        """
+        tree = self.tree
+        size = len(tree)
+        first = slot + 1
+        end = first + len(deltas)
+        pending = list(deltas)
+        for j, delta in enumerate(pending):
+            i = first + j
+            tree[i] += delta
+            parent = i + (i & -i)
+            if parent < end:
+                pending[parent - first] += delta
+            else:
+                while parent < size:
+                    tree[parent] += delta
+                    parent += parent & -parent
+
+    def prefix(self, slot: int) -> float:
+        """Sum of the slots before `slot`."""
+        total = 0
+        tree = self.tree
+        i = slot
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target: float) -> int:
+        """Smallest slot whose prefix sum, itself included, reaches `target`."""
+        tree = self.tree
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] < target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return pos
+
+
+class IndexedQueue(Generic[T]):
+    """
+    A queue with fast positional lookups, used by `PlayList`.
+
+    Items are stored in an array of slots with free room at both ends, so appending
+    at either end is amortized O(1). Two Fenwick trees over the slots keep the number
+    of items and the total weight (the song duration) before each slot, which makes
+    these operations O(log n):
+    - the position of an item (`index`), the item at a position (`get_at`);
+    - removing an item or the item at a position;
+    - the total weight of the items before a position (`weight_before`).
+
+    Items are identified by identity, not equality: the same object can only be
+    queued once, and two equal objects are different entries.
+
+    Inserting in the middle uses the free slots between the two neighbours, if there
+    are enough. Otherwise the slots are rebuilt, O(n), with free room left after the
+    inserted items, about half the queue size. Inserting again right after them, as
+    the pages of a playlist played next are, is then O(k + log² n) for k items, with
+    an O(n) rebuild each time about n/2 items filled the free room.
+    """
+
+    def __init__(self) -> None:
+        self._build([], [])
+
+    def _build(
+        self, items: List[T], weights: List[float], gap_at: int = 0, gap: int = 0
+    ) -> None:
+        """Lay out the items in new slots, with `gap` free slots before `items[gap_at]`."""
+        n = len(items)
+        span = n + gap
+        capacity = max(_MIN_CAPACITY, 2 * span)
+        front = (capacity - span) // 2
+        self._slots: List[Optional[T]] = [None] * capacity
+        self._weights: List[float] = [0] * capacity
+        self._slots[front : front + gap_at] = items[:gap_at]
+        self._weights[front : front + gap_at] = weights[:gap_at]
+        self._slots[front + gap_at + gap : front + span] = items[gap_at:]
+        self._weights[front + gap_at + gap : front + span] = weights[gap_at:]
+        self._front = front
+        self._tail = front + span
+        self._len = n
+        self._pos: Dict[int, int] = {
+            id(item): front + i + (gap if i >= gap_at else 0)
+            for i, item in enumerate(items)
+        }
+        self._counts = _Fenwick([1 if item is not None else 0 for item in self._slots])
+        self._sums = _Fenwick(list(self._weights))
+
+    def _entries(self) -> Tuple[List[T], List[float]]:
+        items: List[T] = []
+        weights: List[float] = []
+        for slot in range(self._front, self._tail):
+            if self._slots[slot] is not None:
+                items.append(self._slots[slot])  # type: ignore
+                weights.append(self._weights[slot])
+        return items, weights
+
+    def _rebuild(self) -> None:
+        self._build(*self._entries())
+
+    def _put(self, slot: int, item: T, weight: float) -> None:
+        self._slots[slot] = item
+        self._weights[slot] = weight
+        self._pos[id(item)] = slot
+        self._counts.add(slot, 1)
+        self._sums.add(slot, weight)
+        self._len += 1
+
+    def _put_block(self, slot: int, items: List[T], weights: List[float]) -> None:
+        """`_put` the items in the free slots from `slot` on, in order."""
+        end = slot + len(items)
+        self._slots[slot:end] = items
+        self._weights[slot:end] = weights
+        for i, item in enumerate(items, slot):
+            self._pos[id(item)] = i
+        self._counts.add_block(slot, [1] * len(items))
+        self._sums.add_block(slot, weights)
+        self._len += len(items)
+
+    def _check_new(self, item: T) -> None:
+        if id(item) in self._pos:
+            raise ValueError("This item is already in the queue.")
+
+    def _check_batch(self, items: List[T], weights: Optional[List[float]]) -> List[float]:
+        if weights is None:
+            weights = [0] * len(items)
+        elif len(weights) != len(items):
+            raise ValueError("There must be one weight per item.")
+        if len({id(item) for item in items}) != len(items):
+            raise ValueError("The same item appears twice in the batch.")
+        for item in items:
+            self._check_new(item)
+        return weights
+
+    def append(self, item: T, weight: float = 0) -> None:
+        """Add an item at the end of the queue."""
+        self._check_new(item)
+        if self._tail == len(self._slots):
+            self._rebuild()
+        self._put(self._tail, item, weight)
+        self._tail += 1
+
+    def appendleft(self, item: T, weight: float = 0) -> None:
+        """Add an item at the front of the queue."""
+        self._check_new(item)
+        if self._front == 0:
+            self._rebuild()
+        self._front -= 1
+        self._put(self._front, item, weight)
+
+    def extend(self, items: List[T], weights: Optional[List[float]] = None) -> None:
+        """
+        Add items at the end of the queue, in order. Nothing is added if one of the
+        items is already queued. Amortized O(1) per item.
+        """
+        weights = self._check_batch(items, weights)
+        if self._tail + len(items) > len(self._slots):
+            current, current_weights = self._entries()
+            self._build(current + items, current_weights + weights)
+            return
+        self._put_block(self._tail, items, weights)
+        self._tail += len(items)
+
+    def extendleft(self, items: List[T], weights: Optional[List[float]] = None) -> None:
+        """
+        Add items at the front of the queue, keeping their order: `items[0]` becomes
+        the first item. Nothing is added if one of the items is already queued.
+        Amortized O(1) per item.
+        """
+        weights = self._check_batch(items, weights)
+        if self._front < len(items):
+            current, current_weights = self._entries()
+            self._build(items + current, weights + current_weights)
+            return
+        self._front -= len(items)
+        self._put_block(self._front, items, weights)
+
+    def insert_many(
+        self, index: int, items: List[T], weights: Optional[List[float]] = None
+    ) -> None:
+        """
+        Insert items before position `index`, in order. Nothing is added if one of
+        the items is already queued. See the class for the cost.
+        """
+        if index <= 0:
+            self.extendleft(items, weights)
+        elif index >= self._len:
+            self.extend(items, weights)
+        else:
+            weights = self._check_batch(items, weights)
+            # The slots of the items before and after the insertion point.
+            before = self._counts.find(index)
+            after = self._counts.find(index + 1)
+            if after - before > len(items):
+                self._put_block(before + 1, items, weights)
+                return
+            current, current_weights = self._entries()
+            self._build(
+                current[:index] + items + current[index:],
+                current_weights[:index] + weights + current_weights[index:],
+                gap_at=index + len(items),
+                gap=(len(current) + len(items)) // 2,
+            )
+
+    def insert(self, index: int, item: T, weight: float = 0) -> None:
+        """Insert an item before position `index`, see `insert_many`."""
+        self.insert_many(index, [item], [weight])
+
+    def _slot_at(self, index: int) -> Optional[int]:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            return None
+        return self._counts.find(index + 1)
+
+    def _remove_slot(self, slot: int) -> T:
+        item: T = self._slots[slot]  # type: ignore
+        del self._pos[id(item)]
+        self._slots[slot] = None
+        self._counts.add(slot, -1)
+        self._sums.add(slot, -self._weights[slot])
+        self._weights[slot] = 0
+        self._len -= 1
+
+        # Keep the used range tight so iteration doesn't walk over freed slots.
+        while self._front < self._tail and self._slots[self._front] is None:
+            self._front += 1
+        while self._tail > self._front and self._slots[self._tail - 1] is None:
+            self._tail -= 1
+        if self._tail - self._front > 2 * self._len + _MIN_CAPACITY:
+            self._rebuild()
+        return item
+
+    def remove(self, item: T) -> bool:
+        """
+        Remove an item.
+
+        Returns:
+            bool: True if the item was in the queue.
+        """
+        slot = self._pos.get(id(item))
+        if slot is None or self._slots[slot] is not item:
+            return False
+        self._remove_slot(slot)
+        return True
+
+    def remove_at(self, index: int) -> Optional[T]:
+        """Remove and return the item at position `index`, None if out of range."""
+        slot = self._slot_at(index)
+        return None if slot is None else self._remove_slot(slot)
+
+    def popleft(self) -> Optional[T]:
+        """Remove and return the first item, None if the queue is empty."""
+        return self.remove_at(0) if self._len else None
+
+    def index(self, item: T) -> Optional[int]:
+        """The position of an item, None if it is not in the queue."""
+        slot = self._pos.get(id(item))
+        if slot is None or self._slots[slot] is not item:
+            return None
+        return int(self._counts.prefix(slot))
+
+    def __contains__(self, item: T) -> bool:
+        return self.index(item) is not None
+
+    def get_at(self, index: int) -> Optional[T]:
+        """The item at position `index`, None if out of range."""
+        slot = self._slot_at(index)
+        return None if slot is None else self._slots[slot]
+
+    def window(self, offset: int, limit: int) -> List[T]:
+        """The items from position `offset`, at most `limit` of them. O(log n + limit)."""
+        offset = max(offset, 0)
+        if limit <= 0 or offset >= self._len:
+            return []
+        slot = self._counts.find(offset + 1)
+        slots = self._slots
+        items: List[T] = []
+        while slot < self._tail and len(items) < limit:
+            item = slots[slot]
+            if item is not None:
+                items.append(item)
+            slot += 1
+        return items
+
+    def update_weight(self, item: T, weight: float) -> None:
+        """Change the weight of an item, ignored if it is not in the queue."""
+        slot = self._pos.get(id(item))
+        if slot is None or self._slots[slot] is not item:
+            return
+        self._sums.add(slot, weight - self._weights[slot])
+        self._weights[slot] = weight
+
+    def weight_before(self, index: Optional[int] = None) -> float:
+        """
+        Total weight of the items before position `index`.
+
+        Args:
+            index (int | None): The position, None for the whole queue.
+        """
+        if index is None or index >= self._len:
+            return self._sums.prefix(len(self._slots))
+        if index <= 0:
+            return 0
+        return self._sums.prefix(self._counts.find(index + 1))
+
+    def clear(self) -> None:
+        self._build([], [])
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[T]:
+        slots = self._slots
+        for slot in range(self._front, self._tail):
+            item = slots[slot]
+            if item is not None:
+                yield item
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, ClassVar, Dict, List, Optional
+
+import constants
+from cogs.music.core.song import (
+    SongMeta,
+    SoundCloudSongMeta,
+    SpotifySongMeta,
+    YouTubeSongMeta,
+)
+from patterns.singleton import SingletonMeta
+from utils.executor import in_executor
+
+_log = logging.getLogger(__name__)
+
+# The song metadata class and the name of its ID field, by provider.
+_SONG_META_TYPES = {
+    "youtube": (YouTubeSongMeta, "video_id"),
+    "soundcloud": (SoundCloudSongMeta, "track_id"),
+    "spotify": (SpotifySongMeta, "track_id"),
+}
+
+
+def dump_song(song: SongMeta) -> List[Any]:
+    """Encode a song metadata as a compact JSON-compatible list."""
+    provider, id_ = song.identity()
+    return [
+        provider,
+        id_,
+        song.duration_ms,
+        song.title,
+        song.author,
+        song.playlist_name,
+        song.webpage_url,
+        song.requester_id,
+    ]
+
+
+def load_song(entry: List[Any]) -> SongMeta:
+    """Decode a song metadata encoded by `dump_song`."""
+    provider, id_, duration_ms, title, author, playlist_name, webpage_url, requester_id = entry
+    song_meta_type, id_field = _SONG_META_TYPES[provider]
+    return song_meta_type(
+        **{id_field: id_},
+        title=title,
+        duration_ms=duration_ms,
+        playlist_name=playlist_name,
+        webpage_url=webpage_url,
+        author=author,
+        requester_id=requester_id,
+    )
+
+
+@dataclass(slots=True)
+class QueueState:
+    """
+    The queue of a guild, as taken on the event loop to be saved.
+
+    Parameters:
+    - current (SongMeta | None): The song playing.
+    - offset_ms (int): How far the current song was played.
+    - queue (List[SongMeta]): The queued songs, in order. A copy of the list,
+      the songs are encoded by `SnapshotStore.save` off the event loop.
+    """
+
+    current: Optional[SongMeta]
+    offset_ms: int
+    queue: List[SongMeta]
+
+
+class SnapshotStore(metaclass=SingletonMeta):
+    """
+    Persistent store of the queue of each guild, so queues survive a restart.
+
+    A snapshot is a JSON object with:
+    - "current": the song that was playing (`dump_song`), or null;
+    - "offset_ms": how far the current song was played;
+    - "queue": the queued songs (`dump_song`), in order.
+
+    Snapshots are kept in an SQLite database under `DATA_FOLDER`. Queries run in
+    `ProviderExecutor`, never on the event loop.
+    """
+
+    def __init__(self, path: str = constants.QUEUE_SNAPSHOT_DB) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Snapshots read at startup that were not restored yet, by guild ID.
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS queue_snapshot (
+                    guild_id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    saved_at INTEGER NOT NULL
+                )
+                """
+            )
+
+    @in_executor("storage")
+    def save(self, guild_id: int, state: QueueState) -> None:
+        """
+        Save the queue of a guild, replacing the previous snapshot. The songs are
+        encoded here, in `ProviderExecutor`. An empty queue (nothing playing, nothing
+        queued) deletes the snapshot instead.
+        """
+        if state.current is None and not state.queue:
+            self.__delete(guild_id)
+            return
+        data = json.dumps(
+            {
+                "current": dump_song(state.current) if state.current is not None else None,
+                "offset_ms": state.offset_ms,
+                "queue": [dump_song(song) for song in state.queue],
+            },
+            separators=(",", ":"),
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queue_snapshot VALUES (?, ?, ?)",
+                (guild_id, data, int(time.time())),
+            )
+
+    @in_executor("storage")
+    def delete(self, guild_id: int) -> None:
+        """Delete the snapshot of a guild."""
+        self.__delete(guild_id)
+
+    def __delete(self, guild_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM queue_snapshot WHERE guild_id = ?", (guild_id,)
+            )
+
+    @in_executor("storage")
+    def __load_all(self) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id, data FROM queue_snapshot WHERE saved_at >= ?",
+                (int(time.time()) - constants.QUEUE_SNAPSHOT_MAX_AGE,),
+            ).fetchall()
+        snapshots = {}
+        for guild_id, data in rows:
+            try:
+                snapshots[guild_id] = json.loads(data)
+            except ValueError:
+                _log.warning(f"Ignoring the unreadable queue snapshot of guild '{guild_id}'.")
+        return snapshots
+
+    async def load(self) -> None:
+        """
+        Read the snapshots of every guild in one query. Called once at startup, the
+        snapshots are only decoded when their guild uses the bot again (`take`).
+        """
+        self._pending = await self.__load_all()
+        _log.info(f"Loaded {len(self._pending)} queue snapshot(s).")
+
+    def take(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """Get the snapshot of a guild read at startup, at most once."""
+        return self._pending.pop(guild_id, None)
+
+
+class SnapshotWriter:
+    """
+    Saves the snapshot of a guild a short while after it changes.
+
+    Changes within `QUEUE_SNAPSHOT_DELAY` seconds are written together, so adding a
+    playlist page by page or skipping songs quickly writes once.
+
+    The writes and deletes of a guild run one at a time, in order, even across
+    writers (a player stopped and a new one started), so a save still running can't
+    bring back a snapshot deleted after it.
+    """
+
+    # One lock per guild, shared by its writers.
+    _locks: ClassVar[Dict[int, asyncio.Lock]] = {}
+
+    def __init__(self, guild_id: int, build: Callable[[], QueueState]) -> None:
+        self.guild_id = guild_id
+        self._build = build
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._lock = self._locks.setdefault(guild_id, asyncio.Lock())
+
+    def schedule(self) -> None:
+        """Save the snapshot soon. Must be called from the event loop."""
+        if self._task is None and not self._closed:
+            self._task = asyncio.create_task(self._write_later())
+
+    async def _write_later(self) -> None:
+        await asyncio.sleep(constants.QUEUE_SNAPSHOT_DELAY)
+        # Changes made while writing schedule another write. From here on the write
+        # is not cancelled by `cancel`: `delete` waits for it instead.
+        self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Save the snapshot now."""
+        async with self._lock:
+            if self._closed:
+                return
+            try:
+                await SnapshotStore().save(self.guild_id, self._build())
+            except Exception as e:
+                _log.error(f"Cannot save the queue snapshot of guild '{self.guild_id}': {e!r}")
+
+    def cancel(self) -> None:
+        """Drop the pending write, if any, and stop saving. The snapshot is kept."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def delete(self) -> None:
+        """Stop saving and delete the snapshot, after the write in progress if any."""
+        self.cancel()
+        async with self._lock:
+            try:
+                await SnapshotStore().delete(self.guild_id)
+            except Exception as e:
+                _log.error(f"Cannot delete the queue snapshot of guild '{self.guild_id}': {e!r}")
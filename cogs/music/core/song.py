@@ -1,17 +1,26 @@
+import asyncio
 import logging
-from dataclasses import dataclass
+import sys
+import time
+import urllib.parse
+from dataclasses import dataclass, field, replace
 from functools import singledispatch
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import constants
+
+from cogs.music.core import stream
 from cogs.music.core.album import Album
 from cogs.music.services.soundcloud.service import SoundCloudService
 from cogs.music.services.spotify import track
+from cogs.music.services.spotify.match_store import MatchStore
 from cogs.music.services.spotify.service import SpotifyService
-from discord.ext import commands
 from pytubefix import Search, YouTube
 from pytubefix.exceptions import VideoUnavailable
 from soundcloud import BasicTrack, Track
-from utils import format_duration, format_playback_count, safe_format_date, safe_getattr
+from utils import format_playback_count, safe_format_date, safe_getattr
+from utils.cache import SingleFlight, TTLCache
+from utils.executor import run_blocking
 
 _logger = logging.getLogger(__name__)
 
@@ -26,13 +35,16 @@ class Song:
     - playback_url (str): The URL to play the song.
     - uploader (str): The name of the uploader.
     - playback_count (str): The number of times the song has been played.
-    - duration (str): The duration of the song.
+    - duration_ms (int): The duration of the song in milliseconds, 0 if unknown.
     - upload_date (str): The date when the song was uploaded.
     - thumbnail (str): The URL to the thumbnail image of the song.
     - webpage_url (str): The URL to the webpage of the song.
     - category (str): The category of the song.
     - album (Album): Song's album
-    - context (commands.Context | None): The context in which the song is being used (if applicable).
+    - requester_id (int): The ID of the user who requested the song.
+    - codec (str | None): The audio codec of the playback URL, None if unknown.
+    - stream_format (str | None): Description of the selected stream format, None if unknown.
+    - start_ms (int): Where to start playing, in milliseconds. Used to resume a restored song.
 
     Methods:
     - info(): Returns a dictionary containing the song's information.
@@ -42,12 +54,15 @@ class Song:
     playback_url: Optional[str]
     uploader: str
     playback_count: str
-    duration: str
+    duration_ms: int
     upload_date: str
     thumbnail: str
     webpage_url: str
     album: Optional["Album"]
-    context: commands.Context
+    requester_id: int
+    codec: Optional[str] = None
+    stream_format: Optional[str] = None
+    start_ms: int = 0
 
     def info(self) -> Dict[str, Any]:
         """
@@ -58,41 +73,65 @@ class Song:
             "playback_url": self.playback_url,
             "uploader": self.uploader,
             "playback_count": self.playback_count,
-            "duration": self.duration,
+            "duration_ms": self.duration_ms,
             "upload_date": self.upload_date,
             "thumbnail": self.thumbnail,
             "webpage_url": self.webpage_url,
             "album": self.album,
+            "codec": self.codec,
+            "stream_format": self.stream_format,
         }
         return song
 
 
-@dataclass(slots=True)
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(slots=True, eq=False)
 class SongMeta:
     """
     Represents a song metadata, contains data used for extract a song's information.
     Mainly used for song queue, before the song was loaded.
+
+    Queues can be long, so a song metadata only keeps what the queue needs: the
+    requester is kept as a user ID and resolved when an embed is rendered, and
+    titles and authors are interned since the same ones repeat across guilds.
+
+    Song metadata compare by identity: two requests of the same song are different
+    queue entries. Use `identity()` to compare the songs themselves.
     """
 
     title: Optional[str]
-    duration: str
+    duration_ms: int
     playlist_name: Optional[str]
     webpage_url: Optional[str]
     author: Optional[str]
-    ctx: commands.Context
+    requester_id: int
+    # Where to start playing, only set on a song restored in the middle of playback.
+    start_ms: int = field(default=0, kw_only=True)
+
+    def __post_init__(self) -> None:
+        self.title = _intern(self.title)
+        self.author = _intern(self.author)
+        self.playlist_name = _intern(self.playlist_name)
 
     def update_meta(self, *args, **kwargs) -> None:
         """This method updates the metadata of the song with the given video information.
         The following attributes will be updated:
         - title
-        - duration
+        - duration_ms
         - webpage_url
         - author
         """
         raise NotImplementedError("This method must be implemented in a subclass.")
 
+    def identity(self) -> Tuple[str, Union[str, int]]:
+        """Returns the (provider, id) pair that identifies the song across guilds."""
+        raise NotImplementedError("This method must be implemented in a subclass.")
 
-@dataclass(slots=True)
+
+@dataclass(slots=True, eq=False)
 class YouTubeSongMeta(SongMeta):
     """
     Represents a song metadata for YouTube, contains data used for extract a song's information.
@@ -102,13 +141,16 @@ class YouTubeSongMeta(SongMeta):
     video_id: str
 
     def update_meta(self, video: YouTube) -> None:
-        self.title = video.title
-        self.duration = format_duration(video.length)
+        self.title = _intern(video.title)
+        self.duration_ms = video.length * 1000
         self.webpage_url = video.watch_url
-        self.author = video.author
+        self.author = _intern(video.author)
 
+    def identity(self) -> Tuple[str, str]:
+        return ("youtube", self.video_id)
 
-@dataclass(slots=True)
+
+@dataclass(slots=True, eq=False)
 class SoundCloudSongMeta(SongMeta):
     """
     Represents a song metadata for SoundCloud, contains data used for extract a song's information.
@@ -118,13 +160,16 @@ class SoundCloudSongMeta(SongMeta):
     track_id: int
 
     def update_meta(self, track: Union[Track, BasicTrack]) -> None:
-        self.title = track.title
-        self.duration = format_duration(track.duration, unit="milliseconds")
+        self.title = _intern(track.title)
+        self.duration_ms = track.duration
         self.webpage_url = track.permalink_url
-        self.author = track.user.username
+        self.author = _intern(track.user.username)
 
+    def identity(self) -> Tuple[str, int]:
+        return ("soundcloud", self.track_id)
 
-@dataclass(slots=True)
+
+@dataclass(slots=True, eq=False)
 class SpotifySongMeta(SongMeta):
     """
     Represents a song metadata for Spotify, contains data used for extract a song's information.
@@ -134,87 +179,258 @@ class SpotifySongMeta(SongMeta):
     track_id: str
 
     def update_meta(self, track: track.Track) -> None:
-        self.title = track.name
-        self.duration = format_duration(track.duration_ms, unit="milliseconds")
+        self.title = _intern(track.name)
+        self.duration_ms = track.duration_ms
         self.webpage_url = track.external_urls.spotify
-        self.author = track.artists[0].name
+        self.author = _intern(track.artists[0].name)
+
+    def identity(self) -> Tuple[str, str]:
+        return ("spotify", self.track_id)
+
+
+# Resolved songs shared by every guild, keyed by SongMeta.identity().
+SONG_CACHE: TTLCache[Tuple[str, Union[str, int]], Song] = TTLCache(
+    maxsize=constants.SONG_CACHE_SIZE, ttl=constants.RENEW_TIME
+)
+_song_flight: SingleFlight[Tuple[str, Union[str, int]], Optional[Song]] = SingleFlight()
+
+
+def playback_url_ttl(playback_url: Optional[str]) -> float:
+    """
+    Get how long a playback URL can be reused, based on its signed expiry time.
+
+    YouTube URLs carry an `expire` query parameter and SoundCloud URLs an `expires` or
+    `Expires` one, all as Unix timestamps. A safety margin is kept so the URL does not
+    expire while FFmpeg is still reading it. URLs without expiry use `RENEW_TIME`.
+
+    Args:
+        playback_url (str | None): The playback URL.
+
+    Returns:
+        float: The time-to-live in seconds, 0 if the URL cannot be cached.
+    """
+    if not playback_url:
+        return 0
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(playback_url).query)
+    for param in ("expire", "expires", "Expires"):
+        if param in query:
+            try:
+                expire = float(query[param][0])
+            except ValueError:
+                break
+            ttl = expire - time.time() - constants.PLAYBACK_URL_EXPIRY_MARGIN
+            return min(max(ttl, 0), constants.RENEW_TIME)
+    return constants.RENEW_TIME
+
+
+def _bind(song: Song, song_meta: SongMeta) -> Song:
+    """Copy a cached song for the request of `song_meta`."""
+    if isinstance(song_meta, SpotifySongMeta):
+        # The album of a Spotify song comes from the track itself.
+        album = song.album
+    else:
+        album = Album(song_meta.playlist_name) if song_meta.playlist_name else None
+    return replace(
+        song,
+        album=album,
+        requester_id=song_meta.requester_id,
+        start_ms=song_meta.start_ms,
+    )
 
 
-@singledispatch
 async def createSong(song_meta: SongMeta) -> Union[Song, None]:
+    """
+    Create a playable song from its metadata.
+
+    Resolved songs are cached process-wide until their playback URL expires, so the
+    same song requested by several guilds is only resolved once. Concurrent requests
+    for a song that is not cached yet share a single resolution.
+
+    Args:
+        song_meta (SongMeta): The metadata of the song.
+
+    Returns:
+        Song | None: The song, or None if it is unavailable.
+    """
+    key = song_meta.identity()
+    song = SONG_CACHE.get(key)
+    if song is None:
+        song = await _song_flight.do(key, lambda: _resolve_song(key, song_meta))
+        if song is None:
+            return None
+    else:
+        _logger.debug(f"Song cache hit for {key}. Stats: {SONG_CACHE.stats()}")
+    return _bind(song, song_meta)
+
+
+async def _resolve_song(
+    key: Tuple[str, Union[str, int]], song_meta: SongMeta
+) -> Union[Song, None]:
+    song = await _create_song(song_meta)
+    if song is not None:
+        SONG_CACHE.set(key, song, ttl=playback_url_ttl(song.playback_url))
+    return song
+
+
+def _fetch_video(video: YouTube) -> YouTube:
+    """
+    Fetch the watch page, video info and streaming data of a YouTube video, so the
+    attributes used to create a song can be read without further requests.
+    This blocks, run it with `run_blocking`.
+
+    Raises:
+        VideoUnavailable: The video can't be played.
+    """
+    video.check_availability()
+    video.streams
+    return video
+
+
+async def _select_youtube_stream(
+    video: YouTube,
+) -> Optional[Tuple[stream.StreamCandidate, str]]:
+    async def resolve(candidate: stream.StreamCandidate) -> str:
+        return await run_blocking("youtube", lambda: candidate.source.url)
+
+    return await stream.select(stream.youtube_candidates(video.streams), resolve)
+
+
+def _match_confidence(song: track.Track, video: YouTube) -> float:
+    """How well a YouTube video matches a Spotify track, from 0 to 1."""
+    duration_score = max(0.0, 1 - abs(song.duration_ms - video.length * 1000) / (60 * 1000))
+    title_score = 1.0 if song.name.lower() in video.title.lower() else 0.0
+    return round((duration_score + title_score) / 2, 3)
+
+
+def _match_youtube_video(song: track.Track) -> Tuple[YouTube, float]:
+    """
+    Search YouTube for the video matching a Spotify track.
+    This blocks, run it with `run_blocking`.
+
+    Returns:
+        Tuple[YouTube, float]: The fetched video and its match confidence.
+    """
+    query = f"'{','.join(artist.name for artist in song.artists)}' '{song.name}' Topic YouTube Music"
+    _logger.info(f'Creating Spotify song: Searching for "{query}"')
+    videos = Search(query, client="WEB").videos
+
+    for vid in videos:
+        if abs(song.duration_ms - vid.length * 1000) < (60 * 1000) or song.name in vid.title:
+            return _fetch_video(vid), _match_confidence(song, vid)
+
+    # If no video match criteria, use the first video
+    return _fetch_video(videos[0]), _match_confidence(song, videos[0])
+
+
+async def _get_youtube_match(song: track.Track) -> YouTube:
+    """
+    Get the YouTube video to play for a Spotify track.
+
+    The match saved in `MatchStore` is used when there is one, otherwise YouTube is
+    searched and the result is saved. A saved video that became unavailable is
+    invalidated and searched again.
+    """
+    store = MatchStore()
+    match = await store.get(song.id)
+    if match is not None:
+        url = f"https://www.youtube.com/watch?v={match.video_id}"
+        try:
+            return await run_blocking(
+                "youtube", lambda: _fetch_video(YouTube(url, client="WEB"))
+            )
+        except VideoUnavailable:
+            await store.invalidate(song.id)
+
+    video, confidence = await run_blocking("youtube", _match_youtube_video, song)
+    await store.put(song.id, video.video_id, confidence)
+    return video
+
+
+@singledispatch
+async def _create_song(song_meta: SongMeta) -> Union[Song, None]:
     raise NotImplementedError(f"Cannot create song from {type(song_meta)}")
 
 
-@createSong.register  # type: ignore
+@_create_song.register  # type: ignore
 async def _(song_meta: YouTubeSongMeta) -> Union[Song, None]:
     url = f"https://www.youtube.com/watch?v={song_meta.video_id}"
-    video = YouTube(url, client="WEB")
     try:
-        video.check_availability()
+        video = await run_blocking(
+            "youtube", lambda: _fetch_video(YouTube(url, client="WEB"))
+        )
     except VideoUnavailable:
         _logger.error(f"This YouTube video is unavailable. ID: {song_meta.video_id}. Title: {song_meta.title}")
         return None
-    playback_url = video.streams.get_audio_only().url
+    selected = await _select_youtube_stream(video)
+    if selected is None:
+        _logger.error(f"No playable stream for this YouTube video. ID: {song_meta.video_id}. Title: {song_meta.title}")
+        return None
+    candidate, playback_url = selected
 
     return Song(
         title=video.title,
         playback_url=playback_url,
         uploader=video.author,
         playback_count=format_playback_count(video.views),
-        duration=song_meta.duration,
+        duration_ms=song_meta.duration_ms,
         upload_date=safe_format_date(video.publish_date),
         thumbnail=video.thumbnail_url,
         webpage_url=video.watch_url,
         album=Album(song_meta.playlist_name) if song_meta.playlist_name else None,
-        context=song_meta.ctx,
+        requester_id=song_meta.requester_id,
+        codec=candidate.codec,
+        stream_format=candidate.describe(),
     )
 
 
-@createSong.register  # type: ignore
+@_create_song.register  # type: ignore
 async def _(song_meta: SoundCloudSongMeta) -> Union[Song, None]:
     sc_service = SoundCloudService()
 
-    track = sc_service.sc.get_track(song_meta.track_id)
+    track = await sc_service.get_track(song_meta.track_id)
     if track is None:
         _logger.error(f"This SoundCloud track is unavailable. ID: {song_meta.track_id}. Title: {song_meta.title}")
         return None
-    playback_url = await sc_service.get_playback_url(track)
+
+    async def resolve(candidate: stream.StreamCandidate) -> str:
+        return await sc_service.get_playback_url(track, candidate.source)
+
+    selected = await stream.select(
+        stream.soundcloud_candidates(track.media.transcodings), resolve
+    )
+    if selected is None:
+        _logger.error(f"No playable stream for this SoundCloud track. ID: {song_meta.track_id}. Title: {song_meta.title}")
+        return None
+    candidate, playback_url = selected
 
     return Song(
         title=track.title,
         playback_url=playback_url,
         uploader=track.user.username,
-        duration=song_meta.duration,
+        duration_ms=song_meta.duration_ms,
         playback_count=format_playback_count(safe_getattr(track, "playback_count", 0)),
         upload_date=safe_format_date(track.created_at),
         thumbnail=sc_service.get_thumbnail(track),
         webpage_url=track.permalink_url,
         album=Album(song_meta.playlist_name) if song_meta.playlist_name else None,
-        context=song_meta.ctx,
+        requester_id=song_meta.requester_id,
+        codec=candidate.codec,
+        stream_format=candidate.describe(),
     )
 
 
-@createSong.register  # type: ignore
+@_create_song.register  # type: ignore
 async def _(song_meta: SpotifySongMeta) -> Union[Song, None]:
     sp_service = SpotifyService()
-    song = sp_service.get_track(song_meta.track_id)
-
-    query = f"'{','.join(artist.name for artist in song.artists)}' '{song.name}' Topic YouTube Music"
-    video = None  # type: ignore
-    videos = Search(query, client="WEB").videos
-    _logger.info(f'Creating Spotify song: Searching for "{query}"')
+    song = await sp_service.get_track(song_meta.track_id)
+    video = await _get_youtube_match(song)
 
-    for vid in videos:
-        print(song.name, vid.title, song.duration_ms, vid.length * 1000)
-        if abs(song.duration_ms - vid.length * 1000) < (60 * 1000) or song.name in vid.title:
-            video = vid
-            break
-
-    # If no video match criteria, use the first video
-    if video is None:
-        video = videos[0]
-
-    playback_url = video.streams.get_audio_only().url
+    selected = await _select_youtube_stream(video)
+    if selected is None:
+        _logger.error(f"No playable stream for Spotify song '{song.name}' on YouTube. ID: {video.video_id}.")
+        await MatchStore().invalidate(song.id)
+        return None
+    candidate, playback_url = selected
     _logger.info(
         f'Creating Spotify song: Actual playback of "{song.name}" is from "[{video.title}]({video.watch_url})"'
     )
@@ -224,16 +440,67 @@ async def _(song_meta: SpotifySongMeta) -> Union[Song, None]:
         playback_url=playback_url,
         uploader=", ".join(artist.name for artist in song.artists),
         playback_count="Unknown",
-        duration=song_meta.duration,
+        duration_ms=song_meta.duration_ms,
         upload_date=song.album.release_date,
         thumbnail=song.album.images[0].url,
         webpage_url=song.external_urls.spotify,
         album=Album(song.album.name) if song.album.name else None,
-        context=song_meta.ctx,
+        requester_id=song_meta.requester_id,
+        codec=candidate.codec,
+        stream_format=candidate.describe(),
     )
 
 
-async def get_songs_info(songs_need_to_update: List[SongMeta]) -> List[SongMeta]:
+async def _hydrate_youtube(songs: List[YouTubeSongMeta]) -> None:
+    async def hydrate(song: YouTubeSongMeta) -> None:
+        url = f"https://www.youtube.com/watch?v={song.video_id}"
+        try:
+            await run_blocking("youtube", lambda: song.update_meta(YouTube(url, client="WEB")))
+        except Exception as e:
+            _logger.warning(f"Cannot get info of YouTube video '{song.video_id}': {e!r}")
+
+    # Bounded by the YouTube concurrency limit of the provider executor.
+    await asyncio.gather(*(hydrate(song) for song in songs))
+
+
+async def _hydrate_soundcloud(songs: List[SoundCloudSongMeta]) -> None:
+    by_id: Dict[int, List[SoundCloudSongMeta]] = {}
+    for song in songs:
+        by_id.setdefault(song.track_id, []).append(song)
+
+    # Songs are updated batch by batch, as the requests finish.
+    async for tracks in SoundCloudService().iter_tracks_info(list(by_id)):
+        for sc_track in tracks:
+            for song in by_id.get(sc_track.id, ()):
+                song.update_meta(sc_track)
+
+
+async def _hydrate_spotify(songs: List[SpotifySongMeta]) -> None:
+    by_id: Dict[str, List[SpotifySongMeta]] = {}
+    for song in songs:
+        by_id.setdefault(song.track_id, []).append(song)
+
+    tracks = await SpotifyService().get_tracks(list(by_id))
+    for sp_track in tracks:
+        for song in by_id.get(sp_track.id, ()):
+            song.update_meta(sp_track)
+
+
+async def get_songs_info(songs_need_to_update: List[Optional[SongMeta]]) -> List[Optional[SongMeta]]:
+    """
+    Fill in the metadata (title, duration, URL, author) of songs, in place.
+
+    Songs are grouped by provider and fetched in batches: Spotify tracks 50 per
+    request, SoundCloud tracks 50 per request, YouTube videos one per request but
+    in parallel, up to the YouTube concurrency limit. The providers are queried
+    concurrently.
+
+    Args:
+        songs_need_to_update (List[SongMeta | None]): The songs to update, None entries are skipped.
+
+    Returns:
+        List[SongMeta | None]: The same list, with the songs updated.
+    """
     sc_songs: List[SoundCloudSongMeta] = []
     yt_songs: List[YouTubeSongMeta] = []
     sp_songs: List[SpotifySongMeta] = []
@@ -247,32 +514,9 @@ async def get_songs_info(songs_need_to_update: List[SongMeta]) -> List[SongMeta]
         elif isinstance(song, SpotifySongMeta):
             sp_songs.append(song)
 
-    # Get YouTube info
-    for song in yt_songs:
-        video = YouTube(f"https://www.youtube.com/watch?v={song.video_id}", client="WEB")
-        song.update_meta(video)
-
-    # Get SoundCloud info
-    sc_service = SoundCloudService()
-    tracks = await sc_service.get_tracks_info([song.track_id for song in sc_songs])
-    for track in tracks:
-        song = next((s for s in sc_songs if s.track_id == track.id), None)
-        if song:
-            song.update_meta(track)
-
-    # Get Spotify info
-    sp_service = SpotifyService()
-    for song in sp_songs:
-        track = sp_service.get_track(song.track_id)
-        song.update_meta(track)
-
-    # Merge all songs back to the original list
-    for song in songs_need_to_update:
-        if isinstance(song, SoundCloudSongMeta):
-            song = next((s for s in sc_songs if s.track_id == song.track_id), song)
-        elif isinstance(song, YouTubeSongMeta):
-            song = next((s for s in yt_songs if s.video_id == song.video_id), song)
-        elif isinstance(song, SpotifySongMeta):
-            song = next((s for s in sp_songs if s.track_id == song.track_id), song)
-
+    await asyncio.gather(
+        _hydrate_youtube(yt_songs),
+        _hydrate_soundcloud(sc_songs),
+        _hydrate_spotify(sp_songs),
+    )
     return songs_need_to_update
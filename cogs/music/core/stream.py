@@ -0,0 +1,169 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+import constants
+from pytubefix import StreamQuery
+
+_logger = logging.getLogger(__name__)
+
+# Bitrates above this bring nothing, Discord voice channels play at most 384 kbps
+# and usually 64-128 kbps.
+MAX_USEFUL_BITRATE = 160
+
+# Typical bitrates (kbps) of SoundCloud transcodings, their presets rarely carry one.
+_SOUNDCLOUD_BITRATES = {"opus": 64, "mp3": 128, "aac": 160}
+
+
+@dataclass(slots=True)
+class StreamCandidate:
+    """
+    Represents one of the formats a song can be streamed in.
+
+    Parameters:
+    - codec (str): The audio codec, e.g. "opus", "mp3", "aac".
+    - container (str): The container, e.g. "webm", "ogg", "mp4", "mpeg".
+    - protocol (str): "progressive" for a plain HTTP file or "hls" for a segmented playlist.
+    - bitrate (int): The average bitrate in kbps, 0 if unknown.
+    - source (Any): The provider object used to resolve the playback URL.
+    """
+
+    codec: str
+    container: str
+    protocol: str
+    bitrate: int
+    source: Any
+
+    def describe(self) -> str:
+        return f"{self.codec}/{self.container} {self.protocol} {self.bitrate}kbps"
+
+
+def rank(
+    candidates: Iterable[StreamCandidate], prefer_fast_start: bool = False
+) -> List[StreamCandidate]:
+    """
+    Sort stream candidates from the cheapest to play to the most expensive.
+
+    The criteria are, in order:
+    - decode cost: opus is passed through to Discord, everything else is transcoded;
+    - startup latency: a progressive file starts faster than an HLS playlist, which
+      needs the playlist and a first segment before any audio;
+    - bitrate: the highest bitrate up to `MAX_USEFUL_BITRATE`, then the lowest above it;
+    - container: webm/ogg before the others as FFmpeg can demux them without seeking.
+
+    Args:
+        candidates (Iterable[StreamCandidate]): The available formats.
+        prefer_fast_start (bool): Rank startup latency before decode cost.
+
+    Returns:
+        List[StreamCandidate]: The candidates, best first.
+    """
+
+    def key(c: StreamCandidate) -> Tuple[int, ...]:
+        decode_cost = 0 if c.codec == "opus" else 1
+        startup_cost = 0 if c.protocol == "progressive" else 1
+        costs = (
+            (startup_cost, decode_cost)
+            if prefer_fast_start
+            else (decode_cost, startup_cost)
+        )
+        return (
+            *costs,
+            -min(c.bitrate, MAX_USEFUL_BITRATE),
+            c.bitrate,
+            0 if c.container in ("webm", "ogg") else 1,
+        )
+
+    return sorted(candidates, key=key)
+
+
+def youtube_candidates(streams: StreamQuery) -> List[StreamCandidate]:
+    """
+    Get the audio-only formats of a YouTube video.
+
+    Args:
+        streams (StreamQuery): `YouTube.streams` of the video.
+
+    Returns:
+        List[StreamCandidate]: The candidates, `source` is the pytubefix `Stream`.
+    """
+    return [
+        StreamCandidate(
+            codec=stream.audio_codec or "unknown",
+            container=stream.subtype,
+            # OTF streams are served in segments like HLS and often start slower.
+            protocol="hls" if stream.is_otf else "progressive",
+            bitrate=(stream.bitrate or 0) // 1000,
+            source=stream,
+        )
+        for stream in streams.filter(only_audio=True)
+    ]
+
+
+def soundcloud_candidates(transcodings: Iterable[Any]) -> List[StreamCandidate]:
+    """
+    Get the formats of a SoundCloud track.
+
+    Args:
+        transcodings (Iterable[Transcoding]): `track.media.transcodings` of the track.
+
+    Returns:
+        List[StreamCandidate]: The candidates, `source` is the soundcloud `Transcoding`.
+    """
+    candidates = []
+    for transcoding in transcodings:
+        if transcoding.snipped:
+            # Preview of a track that can't be played in full.
+            continue
+        mime_type = transcoding.format.mime_type
+        if "opus" in mime_type:
+            codec = "opus"
+        elif "mpeg" in mime_type:
+            codec = "mp3"
+        else:
+            codec = "aac"
+        container = mime_type.split(";")[0].split("/")[-1]
+        bitrate = re.search(r"(\d+)k", transcoding.preset)
+        candidates.append(
+            StreamCandidate(
+                codec=codec,
+                container=container,
+                protocol=transcoding.format.protocol,
+                bitrate=(
+                    int(bitrate.group(1)) if bitrate else _SOUNDCLOUD_BITRATES[codec]
+                ),
+                source=transcoding,
+            )
+        )
+    return candidates
+
+
+async def select(
+    candidates: List[StreamCandidate],
+    resolve: Callable[[StreamCandidate], Awaitable[str]],
+    prefer_fast_start: bool = constants.STREAM_PREFER_FAST_START,
+) -> Optional[Tuple[StreamCandidate, str]]:
+    """
+    Resolve the playback URL of the best candidate, falling back to the next one
+    if it fails.
+
+    Args:
+        candidates (List[StreamCandidate]): The available formats.
+        resolve (Callable[[StreamCandidate], Awaitable[str]]): Gets the playback URL of a candidate.
+        prefer_fast_start (bool): See `rank`.
+
+    Returns:
+        Tuple[StreamCandidate, str] | None: The chosen candidate and its playback URL,
+        or None if every candidate failed.
+    """
+    for candidate in rank(candidates, prefer_fast_start):
+        try:
+            url = await resolve(candidate)
+        except Exception as e:
+            _logger.warning(f"Cannot resolve stream {candidate.describe()}: {e!r}")
+            continue
+        if url:
+            _logger.debug(f"Selected stream {candidate.describe()}")
+            return candidate, url
+    return None
@@ -1,35 +1,73 @@
 import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Literal, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from cogs.music.core.song import (
     SongMeta,
     SoundCloudSongMeta,
     SpotifySongMeta,
     YouTubeSongMeta,
-    format_duration,
 )
 from cogs.music.services.soundcloud.service import SoundCloudService
 from cogs.music.services.spotify import album, playlist, search, track
+from cogs.music.services.spotify.compact import CompactTrack
 from cogs.music.services.spotify.service import SpotifyService
+from cogs.music.services.youtube.service import ListedVideo, PlaylistPage, YouTubeService
 from core.exceptions import ExtractException
 from discord.ext import commands
-from pytubefix import Playlist, Search, YouTube
+from pytubefix import YouTube
 from pytubefix.exceptions import VideoUnavailable
 from soundcloud import BasicTrack, MiniTrack
 from soundcloud.resource.track import Track
+from utils.cache import SingleFlight
+from utils.executor import run_blocking
 
 _log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# URL resolutions in flight, by (provider, kind, URL or page token). They return
+# provider data, never `SongMeta`, so each caller builds the metadata of its own
+# requester from the shared result.
+_resolutions: SingleFlight[Tuple[str, str, str], Any] = SingleFlight()
+
 
 class Extractor(ABC):
     def __init__(self) -> None:
         self.loop = asyncio.get_event_loop()
 
-    @abstractmethod
-    async def create_song_metadata(self, data, ctx, playlist_name) -> SongMeta:
-        pass
+    @staticmethod
+    async def _coalesce(
+        key: Tuple[str, str, str], func: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Run an upstream call, or join the identical call already in flight, e.g. when
+        several users play the same link at once.
+
+        Args:
+            key (Tuple[str, str, str]): The provider, the kind of call and its argument.
+            func (Callable[[], Awaitable[T]]): Starts the call.
+
+        Returns:
+            T: The shared result. It must not be modified.
+        """
+        coalesced = _resolutions.coalesced
+        result = await _resolutions.do(key, func)
+        if _resolutions.coalesced != coalesced:
+            _log.debug(f"Joined the resolution in flight for {key}.")
+        return result
 
     @abstractmethod
     async def get_data(
@@ -42,57 +80,118 @@ class Extractor(ABC):
     ) -> List[SongMeta] | None:
         pass
 
+    async def iter_data(
+        self, query: str, ctx: commands.Context, is_playlist: bool = False
+    ) -> AsyncIterator[List[SongMeta]]:
+        """
+        Resolve a URL and yield its songs page by page, so the first songs can be
+        queued before a long playlist is fully read.
+
+        Extractors that can't read a URL incrementally yield everything as one page.
+
+        Args:
+            query (str): The URL.
+            ctx (commands.Context): The context of the request.
+            is_playlist (bool): The URL is a playlist, for extractors that can't tell
+                from the URL itself.
+
+        Yields:
+            List[SongMeta]: The songs of a page, never empty.
+        """
+        songs = await self.get_data(query, ctx)
+        if songs:
+            yield songs
+
 
 class YoutubeExtractor(Extractor):
     def __init__(self) -> None:
         super().__init__()
+        self.youtube = YouTubeService()
 
-    async def create_song_metadata(
-        self, yt: YouTube, ctx: commands.Context, playlist_name: str | None
+    @staticmethod
+    def _listed_song_metadata(
+        video: ListedVideo, ctx: commands.Context, playlist_name: str | None
     ) -> YouTubeSongMeta:
+        """Build the metadata from listing data, without fetching the video."""
         return YouTubeSongMeta(
-            title=yt.title,
-            duration=format_duration(yt.length),
-            video_id=yt.video_id,
-            ctx=ctx,
+            title=video.title,
+            duration_ms=video.duration_ms,
+            video_id=video.video_id,
+            requester_id=ctx.author.id,
             playlist_name=playlist_name,
-            webpage_url=yt.watch_url,
-            author=yt.author,
+            webpage_url=video.watch_url,
+            author=video.author,
         )
 
     async def get_data(
         self, query: str, ctx, is_search=False, is_playlist=False, limit=1
     ) -> List[YouTubeSongMeta] | None:
         if is_search:
-            results = Search(query, client="WEB").videos
+            results = await self.youtube.search(query, limit=limit)
             if results:
-                songs = await asyncio.gather(
-                    *[
-                        self.create_song_metadata(result, ctx, None)
-                        for result in results[:limit]
-                    ]
-                )
-                return songs
+                return [
+                    self._listed_song_metadata(result, ctx, None) for result in results
+                ]
             return None
 
         if is_playlist:
-            playlist = Playlist(query, client="WEB")
-            songs = await asyncio.gather(
-                *[
-                    self.create_song_metadata(video, ctx, playlist.title)
-                    for video in playlist.videos
-                ]
-            )
+            songs = []
+            async for page in self.iter_data(query, ctx, is_playlist=True):
+                songs.extend(page)
             return songs
         else:
             try:
-                yt = YouTube(query, client="WEB")
-
+                video = await self._coalesce(
+                    ("youtube", "video", query),
+                    lambda: run_blocking("youtube", self._read_video, query),
+                )
             except VideoUnavailable:
                 return None
 
-            song = await self.create_song_metadata(yt, ctx, None)
-            return [song]
+            return [self._listed_song_metadata(video, ctx, None)]
+
+    @staticmethod
+    def _read_video(url: str) -> ListedVideo:
+        """Fetch the details of a video. Blocking."""
+        yt = YouTube(url, client="WEB")
+        return ListedVideo(
+            video_id=yt.video_id,
+            title=yt.title,
+            duration_ms=yt.length * 1000,
+            author=yt.author,
+        )
+
+    async def iter_data(
+        self, query: str, ctx: commands.Context, is_playlist: bool = False
+    ) -> AsyncIterator[List[YouTubeSongMeta]]:
+        if not is_playlist:
+            async for page in super().iter_data(query, ctx):
+                yield page
+            return
+
+        # Videos are built from the playlist pages, one request per 100 videos.
+        # Videos without a title (shorts) are filled in by the playlist hydration.
+        page: Optional[PlaylistPage] = await self._coalesce(
+            ("youtube", "playlist", query), lambda: self.youtube.get_playlist(query)
+        )
+        count = 0
+        while page is not None:
+            if page.videos:
+                count += len(page.videos)
+                yield [
+                    self._listed_song_metadata(video, ctx, page.title)
+                    for video in page.videos
+                ]
+            page = await self.__next_page(page)
+        _log.info(f"Extracted {count} song(s) from YouTube playlist.")
+
+    async def __next_page(self, page: PlaylistPage) -> Optional[PlaylistPage]:
+        if page.continuation is None:
+            return None
+        return await self._coalesce(
+            ("youtube", "playlist_page", page.continuation),
+            lambda: self.youtube.get_next_page(page),
+        )
 
 
 class SoundCloudExtractor(Extractor):
@@ -108,13 +207,9 @@ class SoundCloudExtractor(Extractor):
     ) -> SoundCloudSongMeta:
         return SoundCloudSongMeta(
             title=track.title if not isinstance(track, MiniTrack) else None,
-            duration=(
-                format_duration(track.duration, unit="milliseconds")
-                if not isinstance(track, MiniTrack)
-                else "0"
-            ),
+            duration_ms=track.duration if not isinstance(track, MiniTrack) else 0,
             track_id=track.id,
-            ctx=ctx,
+            requester_id=ctx.author.id,
             playlist_name=playlist_name,
             webpage_url=(
                 track.permalink_url if not isinstance(track, MiniTrack) else None
@@ -128,21 +223,26 @@ class SoundCloudExtractor(Extractor):
         self, query, ctx, is_search=False, limit=1
     ) -> List[SoundCloudSongMeta] | None:
         if is_search:
-            data = await self.soundcloud.search(query)
             tracks = []
-            for _ in range(limit):
-                track = next(data)
-                while not isinstance(track, (Track, BasicTrack)):
-                    track = next(data)
-                tracks.append(track)
+            results = self.soundcloud.search(query)
+            try:
+                async for item in results:
+                    tracks.append(item)
+                    if len(tracks) >= limit:
+                        break
+            finally:
+                await results.aclose()
 
             songs = await asyncio.gather(
-                *[self.create_song_metadata(track, ctx, None) for track in tracks]
+                *[self.create_song_metadata(item, ctx, None) for item in tracks]
             )
 
             return songs
 
-        data = await self.soundcloud.extract_song_from_url(query)
+        data = await self._coalesce(
+            ("soundcloud", "url", query),
+            lambda: self.soundcloud.extract_song_from_url(query),
+        )
 
         if data is None:
             raise ExtractException("Failed to extract song from SoundCloud URL")
@@ -150,7 +250,7 @@ class SoundCloudExtractor(Extractor):
         playlist_name = data["playlist_name"]
         tracks = data["tracks"]
         songs = await asyncio.gather(
-            *[self.create_song_metadata(track, ctx, playlist_name) for track in tracks]
+            *[self.create_song_metadata(item, ctx, playlist_name) for item in tracks]
         )
         _log.info(f"Extracted {len(songs)} song(s) from SoundCloud URL.")
         return songs
@@ -163,18 +263,24 @@ class SpotifyExtractor(Extractor):
 
     async def create_song_metadata(
         self,
-        data: Union[search.Track, playlist.Track, track.Track, album.Track],
+        data: Union[search.Track, playlist.Track, track.Track, album.Track, CompactTrack],
         ctx,
         playlist_name,
     ) -> SpotifySongMeta:
+        if isinstance(data, CompactTrack):
+            webpage_url = data.url
+            author = ", ".join(data.artists)
+        else:
+            webpage_url = data.external_urls.spotify
+            author = ", ".join([artist.name for artist in data.artists])
         return SpotifySongMeta(
             title=data.name,
-            duration=format_duration(data.duration_ms, unit="milliseconds"),
+            duration_ms=data.duration_ms,
             track_id=data.id,
-            ctx=ctx,
+            requester_id=ctx.author.id,
             playlist_name=playlist_name,
-            webpage_url=data.external_urls.spotify,
-            author=", ".join([artist.name for artist in data.artists]),
+            webpage_url=webpage_url,
+            author=author,
         )
 
     async def get_data(
@@ -186,33 +292,47 @@ class SpotifyExtractor(Extractor):
         limit: int = 1,
     ) -> List[SpotifySongMeta] | None:
         if is_search:
-            data = self.sp.search(query, limit=limit)
+            data = await self.sp.search(query, limit=limit)
             songs = await asyncio.gather(
                 *[self.create_song_metadata(track, ctx, None) for track in data.items]
             )
             return songs
 
-        data = await self.sp.resolve_url(query)
-        if isinstance(data, playlist.Playlist):
-            playlist_name = data.name
-            songs = await asyncio.gather(
-                *[
-                    self.create_song_metadata(track.track, ctx, playlist_name)
-                    for track in data.tracks.items
-                ]
-            )
-        elif isinstance(data, album.Album):
-            playlist_name = data.name
-            songs = await asyncio.gather(
-                *[
-                    self.create_song_metadata(track, ctx, playlist_name)
-                    for track in data.tracks.items
-                ]
-            )
-        elif isinstance(data, track.Track):
-            songs = [await self.create_song_metadata(data, ctx, None)]
+        songs = []
+        async for page in self.iter_data(query, ctx):
+            songs.extend(page)
         return songs
 
+    async def iter_data(
+        self, query: str, ctx: commands.Context, is_playlist: bool = False
+    ) -> AsyncIterator[List[SpotifySongMeta]]:
+        """
+        Resolve a Spotify URL and yield its songs page by page, as the pages of a
+        playlist or album arrive.
+
+        Args:
+            query (str): A Spotify track, album or playlist URL.
+            ctx (commands.Context): The context of the request.
+            is_playlist (bool): Unused, the type is read from the URL.
+
+        Yields:
+            List[SpotifySongMeta]: The songs of a page.
+        """
+        # Only the fields of the queue are decoded, the full track is read when played.
+        data = await self._coalesce(
+            ("spotify", "url", query), lambda: self.sp.resolve_compact(query)
+        )
+        if isinstance(data, CompactTrack):
+            yield [await self.create_song_metadata(data, ctx, None)]
+            return
+
+        playlist_name = data.name
+        async for tracks in self.sp.iter_tracks(data):
+            yield await asyncio.gather(
+                *[self.create_song_metadata(t, ctx, playlist_name) for t in tracks]
+            )
+        _log.info(f"Extracted all songs from Spotify {data.type} '{playlist_name}'.")
+
 
 class ExtractorFactory:
     extractors = {
@@ -1,51 +1,95 @@
-import asyncio
-from typing import TYPE_CHECKING, List, Optional
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import discord
 from cogs.components.discord_embed import Embed
 from cogs.music.core.playlist import PlayList
+from cogs.music.core.snapshot import QueueState, SnapshotWriter, load_song
 from discord.ext import commands
 from patterns.singleton import SingletonMeta
-from utils import convert_to_second, convert_to_time, get_time
 
 if TYPE_CHECKING:
     from cogs.music.controller import Audio
     from cogs.music.core.song import Song, SongMeta
 
+_log = logging.getLogger(__name__)
+
 
 class PlaylistManager:
-    def __init__(self):
+    def __init__(self, guild_id: Optional[int] = None):
         self.playlist: PlayList = PlayList()
         self.current_song: Optional[Song] = None
         self.prev_song: Optional[Song] = None
+        # Monotonic clock reading, in seconds, when the current song started.
         self.current_song_start_time: float = 0
-        self.current_song_duration: float = 0
-
-    async def add_songs(self, songs: List['SongMeta'], priority: bool = False) -> None:
-        add_method = self.playlist.add_next if priority else self.playlist.add
-        await asyncio.gather(*(add_method(song) for song in songs))
-        self.playlist.trigger_update_all_song_meta()
-
-    def calculate_wait_time(self, latest_song: 'SongMeta', priority: bool) -> float:
-        current_time = convert_to_second(get_time())
-        time_wait = self.current_song_duration - (
-            current_time - self.current_song_start_time
-        )
+        self.current_song_duration_ms: int = 0
+
+        # The queue of a guild is saved after every change, see `SnapshotStore`.
+        self.snapshots: Optional[SnapshotWriter] = None
+        if guild_id is not None:
+            self.snapshots = SnapshotWriter(guild_id, self.build_snapshot)
+            self.playlist.on_change = self.snapshots.schedule
+
+    def build_snapshot(self) -> QueueState:
+        """
+        The state of the queue and of the song playing, see `SnapshotStore`. Only the
+        list of songs is copied here, they are encoded off the event loop.
+        """
+        current = self.playlist.current if self.current_song is not None else None
+        offset_ms = 0
+        if current is not None:
+            offset_ms = int((time.monotonic() - self.current_song_start_time) * 1000)
+        return QueueState(current, offset_ms, list(self.playlist))
+
+    def save_snapshot(self) -> None:
+        """Save the snapshot soon, for changes the playlist doesn't see (a song starting or ending)."""
+        if self.snapshots is not None:
+            self.snapshots.schedule()
+
+    def restore_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Put back the queue saved in a snapshot. The song that was playing is put first
+        and resumes where it stopped.
+        """
+        songs = [load_song(entry) for entry in snapshot["queue"]]
+        if snapshot["current"] is not None:
+            current = load_song(snapshot["current"])
+            current.start_ms = max(snapshot["offset_ms"], 0)
+            songs.insert(0, current)
+        self.playlist.restore(songs)
+        _log.info(f"Restored {len(songs)} song(s) from a queue snapshot.")
+
+    async def add_songs(
+        self,
+        songs: List['SongMeta'],
+        priority: bool = False,
+        after: Optional['SongMeta'] = None,
+        skip_duplicates: bool = False,
+    ) -> List['SongMeta']:
+        added = await self.playlist.add_many(songs, priority, after, skip_duplicates)
+        if added:
+            self.playlist.trigger_update_all_song_meta()
+        return added
+
+    def calculate_wait_time(self, index: int, priority: bool) -> int:
+        """The estimated time in milliseconds until the song at `index` starts playing."""
+        elapsed_ms = int((time.monotonic() - self.current_song_start_time) * 1000)
+        time_wait = max(self.current_song_duration_ms - elapsed_ms, 0)
         if not priority:
-            time_wait += convert_to_second(
-                self.playlist.time_wait(self.playlist.index(latest_song))
-            )
+            time_wait += self.playlist.time_wait(index)
         return time_wait
 
     def get_song_added_embed(
         self, ctx: commands.Context, latest_song: 'SongMeta', priority: bool
     ) -> Optional[discord.Embed]:
-        if self.playlist.size() > 0 and self.playlist.index(latest_song) is not None:
-            time_wait = self.calculate_wait_time(latest_song, priority)
+        index = self.playlist.index(latest_song)
+        if index is not None:
+            time_wait = self.calculate_wait_time(index, priority)
             return Embed(ctx).add_song(
                 latest_song,
-                position=self.playlist.index(latest_song) + 1,
-                timewait=convert_to_time(time_wait),
+                position=index + 1,
+                timewait_ms=time_wait,
             )
         return None
 
@@ -72,7 +72,7 @@ class Music(commands.Cog):
         self,
         interaction: discord.Interaction,
         query: str,
-        provider: Optional[Literal["youtube", "soundcloud", "spotify"]] = "youtube",
+        provider: Optional[Literal["youtube", "soundcloud", "spotify", "all"]] = "youtube",
     ) -> None:
         if not interaction.response.is_done():
             await self.set_reply_timeout(interaction)
@@ -89,7 +89,9 @@ class Music(commands.Cog):
         name="play", description="Adds a song or playlist to the queue and plays it."
     )
     @ensure_voice
-    async def p(self, interaction: discord.Interaction, query: str) -> None:
+    async def p(
+        self, interaction: discord.Interaction, query: str, skip_duplicates: bool = False
+    ) -> None:
         if not interaction.response.is_done():
             await self.set_reply_timeout(interaction)
         ctx = await self.bot.get_context(interaction)
@@ -99,14 +101,16 @@ class Music(commands.Cog):
 
         if interaction.guild_id:
             audio = get_or_create_audio(self.bot, interaction.guild_id)
-            await audio.process_query(ctx, query)
+            await audio.process_query(ctx, query, skip_duplicates=skip_duplicates)
 
     @app_commands.command(
         name="playnext",
         description="You just found a great song and want to listen it right now.",
     )
     @ensure_voice
-    async def pn(self, interaction: discord.Interaction, query: str) -> None:
+    async def pn(
+        self, interaction: discord.Interaction, query: str, skip_duplicates: bool = False
+    ) -> None:
         if not interaction.response.is_done():
             await self.set_reply_timeout(interaction)
         ctx = await self.bot.get_context(interaction)
@@ -116,7 +120,7 @@ class Music(commands.Cog):
 
         if interaction.guild_id:
             audio = get_or_create_audio(self.bot, interaction.guild_id)
-            await audio.process_query(ctx, query, True)
+            await audio.process_query(ctx, query, True, skip_duplicates)
 
     @app_commands.command(name="queue", description="Show the current playlist.")
     async def queue(self, interaction: discord.Interaction) -> None:
@@ -135,9 +139,10 @@ class Music(commands.Cog):
                     )
                 )
             else:
-                playlist = await self.player_manager.players[
+                # The view reads the playlist one page at a time.
+                playlist = self.player_manager.players[
                     interaction.guild_id
-                ].playlist_manager.playlist.get_list()
+                ].playlist_manager.playlist
                 view = MusicView(
                     playlist,
                     self.player_manager.players[
@@ -1,13 +1,45 @@
+import asyncio
+import itertools
 import logging
+import time
+import unicodedata
 import urllib.parse
-from typing import List, Literal, Optional
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 
+import constants
+from cogs.music.core.snapshot import dump_song, load_song
 from cogs.music.core.song import SongMeta
 from cogs.music.extractor import ExtractorFactory
 from discord.ext import commands
+from utils.cache import TTLCache
+from utils.metrics import Histogram
 
 _log = logging.getLogger(__name__)
 
+# Text search results by (provider or "auto", limit, normalized query). Songs are
+# kept as `dump_song` entries without the requester, not as `SongMeta`, since a
+# `SongMeta` is a queue entry of its own.
+SEARCH_CACHE: TTLCache[Tuple[str, int, str], Tuple[Tuple[Any, ...], ...]] = TTLCache(
+    maxsize=constants.SEARCH_CACHE_SIZE, ttl=constants.SEARCH_CACHE_TTL
+)
+
+# Time taken by each search provider to answer a text search.
+SEARCH_LATENCY: Dict[str, Histogram] = {
+    provider: Histogram(f"search_latency_seconds_{provider}")
+    for provider in constants.SEARCH_PROVIDERS
+}
+
+
+def normalize_query(query: str) -> str:
+    """Fold the case, the Unicode form and the spacing of a search query."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def _discard_result(task: asyncio.Task) -> None:
+    """Retrieve the exception of a finished task, so asyncio doesn't report it."""
+    if not task.cancelled():
+        task.exception()
+
 
 class Search:
     "Methods: query"
@@ -43,12 +75,62 @@ class Search:
         netloc = parsed_url.netloc
         return netloc.lower() == "open.spotify.com"
 
+    def _resolve_url(
+        self, url: str
+    ) -> Tuple[Literal["youtube", "soundcloud", "spotify"], str, bool]:
+        """
+        Find the provider of a URL.
+
+        Returns:
+            Tuple[str, str, bool]: The provider, the URL to give to its extractor and
+            whether the URL is a YouTube playlist.
+
+        Raises:
+            ValueError: The URL is not supported.
+        """
+        if self.is_youtube(url) or self.is_youtube_music(url):
+            if self.is_youtube_music(url):
+                url = url.replace("music.", "")
+            return "youtube", url, "/playlist?" in url or "&list=" in url
+        if self.is_soundcloud(url):
+            return "soundcloud", url, False
+        if self.is_spotify(url):
+            return "spotify", url, False
+        _log.error(f"Unsupported URL '{url}'")
+        raise ValueError(f"Unsupported URL '{url}'")
+
+    async def iter_query(
+        self, query: str, ctx: commands.Context
+    ) -> AsyncIterator[List[SongMeta]]:
+        """
+        Like `query`, but yields the songs of a playlist URL page by page as they
+        are read, so they can be queued before the whole playlist is known.
+        Searches and single songs are yielded as one page.
+
+        Args:
+            query (str): The search string or URL to query.
+            ctx (commands.Context): The context in which the command was invoked.
+        Yields:
+            List[SongMeta]: The songs of a page, never empty.
+        """
+        if not self.is_url(query):
+            songs = await self.query(query, ctx)
+            if songs:
+                yield songs
+            return
+
+        provider, query, is_playlist = self._resolve_url(query)
+        extractor = ExtractorFactory.get_extractor(provider)
+        async for page in extractor.iter_data(query, ctx, is_playlist=is_playlist):
+            songs = [song for song in page if song is not None]
+            if songs:
+                yield songs
+
     async def query(
         self,
         query: str,
         ctx: commands.Context,
-        priority: bool = False,
-        provider: Optional[Literal["youtube", "soundcloud", "spotify"]] = None,
+        provider: Optional[Literal["youtube", "soundcloud", "spotify", "all"]] = None,
         limit: int = 1,
     ) -> Optional[List[SongMeta]]:
         """
@@ -57,18 +139,52 @@ class Search:
         If the query is a URL, it determines whether it is a SoundCloud or YouTube link and fetches the data
         accordingly.
 
-        If the query is not a URL, it first attempts to search SoundCloud, and if no results are found, it searches
-        YouTube.
+        If the query is not a URL, the `SEARCH_PROVIDERS` are searched at the same time and the results of
+        the first of them that found something are returned (see `SEARCH_FAN_OUT`). Search results are
+        cached for every guild, see `SEARCH_CACHE`.
         Args:
             query (str): The search string or URL to query.
             ctx (commands.Context): The context in which the command was invoked.
-            priority (bool, optional): If True, the order of the songs will be reversed. Defaults to False.
+            provider (str | None): Only search this provider. "all" merges the results of
+                every search provider, ranked alternately.
+            limit (int): The maximum number of songs per provider.
         Returns:
             List[SongMeta] | None: A list of SongMeta objects if songs are found, otherwise None.
         """
+        if self.is_url(query):
+            songs = await self.__fetch(query, ctx, provider, limit)
+        else:
+            key = (provider or "auto", limit, normalize_query(query))
+            cached = SEARCH_CACHE.get(key)
+            if cached is not None:
+                _log.debug(f"Search cache hit for {key}. Stats: {SEARCH_CACHE.stats()}")
+                return [load_song([*entry, ctx.author.id]) for entry in cached]
+            songs = await self.__fetch(query, ctx, provider, limit)
+            if songs:
+                # Without the requester, which is set again for each caller.
+                SEARCH_CACHE.set(
+                    key,
+                    tuple(tuple(dump_song(song)[:-1]) for song in songs if song is not None),
+                )
+
+        if songs:
+            return [song for song in songs if song is not None]
+        else:
+            _log.error(f"No results were found for the query '{query}'")
+            return None
+
+    async def __fetch(
+        self,
+        query: str,
+        ctx: commands.Context,
+        provider: Optional[Literal["youtube", "soundcloud", "spotify", "all"]],
+        limit: int,
+    ) -> Optional[List[Optional[SongMeta]]]:
         songs = []
 
-        if provider:
+        if provider == "all":
+            songs = await self.__fan_out(query, ctx, limit, merge=True)
+        elif provider:
             if provider == "youtube":
                 songs = await ExtractorFactory.get_extractor("youtube").get_data(
                     query=query, ctx=ctx, is_search=not self.is_url(query), limit=limit
@@ -83,40 +199,98 @@ class Search:
                 )
             else:
                 _log.error(f"Invalid provider '{provider}'")
-                return ValueError(f"Invalid provider '{provider}'")
+                raise ValueError(f"Invalid provider '{provider}'")
         else:
             if self.is_url(query):
-                if self.is_youtube(query) or self.is_youtube_music(query):
-                    if self.is_youtube_music(query):
-                        query = query.replace("music.", "")
-                    is_playlist = "/playlist?" in query or "&list=" in query
+                provider, query, is_playlist = self._resolve_url(query)
+                if provider == "youtube":
                     songs = await ExtractorFactory.get_extractor("youtube").get_data(
                         query=query, ctx=ctx, is_playlist=is_playlist, limit=limit
                     )
-                elif self.is_soundcloud(query):
-                    songs = await ExtractorFactory.get_extractor("soundcloud").get_data(
-                        query=query, ctx=ctx, limit=limit
-                    )
-                elif self.is_spotify(query):
-                    songs = await ExtractorFactory.get_extractor("spotify").get_data(
+                else:
+                    songs = await ExtractorFactory.get_extractor(provider).get_data(
                         query=query, ctx=ctx, limit=limit
                     )
-                else:
-                    _log.error(f"Unsupported URL '{query}'")
-                    raise ValueError(f"Unsupported URL '{query}'")
+            elif constants.SEARCH_FAN_OUT:
+                songs = await self.__fan_out(query, ctx, limit)
             else:
-                songs = await ExtractorFactory.get_extractor("youtube").get_data(
-                    query=query, ctx=ctx, is_search=True, limit=limit
-                )
-                if not songs:
-                    songs = await ExtractorFactory.get_extractor("soundcloud").get_data(
-                        query=query, ctx=ctx, is_search=True, limit=limit
-                    )
+                for search_provider in constants.SEARCH_PROVIDERS:
+                    songs = await self.__timed_search(search_provider, query, ctx, limit)
+                    if songs:
+                        break
 
-        if songs:
-            if priority:
-                songs.reverse()
-            return [song for song in songs if song is not None]
-        else:
-            _log.error(f"No results were found for the query '{query}'")
-            return None
+        return songs
+
+    async def __timed_search(
+        self, provider: str, query: str, ctx: commands.Context, limit: int
+    ) -> Optional[List[Optional[SongMeta]]]:
+        start = time.perf_counter()
+        songs = await ExtractorFactory.get_extractor(provider).get_data(
+            query=query, ctx=ctx, is_search=True, limit=limit
+        )
+        # Only searches that finished are measured, not the ones cancelled.
+        SEARCH_LATENCY[provider].observe(time.perf_counter() - start)
+        return songs
+
+    async def __fan_out(
+        self, query: str, ctx: commands.Context, limit: int, merge: bool = False
+    ) -> List[Optional[SongMeta]]:
+        """
+        Search every provider of `SEARCH_PROVIDERS` at the same time, for at most
+        `SEARCH_DEADLINE` seconds.
+
+        Without `merge`, the results of the first provider in order of preference
+        that found something are returned as soon as it answered, and the other
+        searches are cancelled. A provider that fails or misses the deadline is
+        skipped. With `merge`, the results of every provider that answered in time
+        are ranked alternately: the first result of each provider, then the second...
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + constants.SEARCH_DEADLINE
+        tasks = {
+            provider: asyncio.create_task(self.__timed_search(provider, query, ctx, limit))
+            for provider in constants.SEARCH_PROVIDERS
+        }
+        results: List[List[Optional[SongMeta]]] = []
+        try:
+            for provider, task in tasks.items():
+                if not task.done():
+                    await asyncio.wait((task,), timeout=max(deadline - loop.time(), 0))
+                if not task.done():
+                    _log.warning(
+                        f"The {provider} search for '{query}' missed the deadline of {constants.SEARCH_DEADLINE} seconds."
+                    )
+                    continue
+                if task.exception() is not None:
+                    _log.error(f"The {provider} search for '{query}' failed: {task.exception()!r}")
+                    continue
+                songs = task.result()
+                if not songs:
+                    continue
+                if not merge:
+                    return songs
+                results.append(songs)
+        finally:
+            for task in tasks.values():
+                # A cancelled search can still fail, e.g. while closing its
+                # connection: its error is dropped with its results instead of
+                # being logged as never retrieved.
+                task.add_done_callback(_discard_result)
+                task.cancel()
+            latency = {
+                provider: histogram.snapshot()
+                for provider, histogram in SEARCH_LATENCY.items()
+            }
+            _log.debug(
+                "Search latency: "
+                + ", ".join(
+                    f"{provider} mean {stats['mean']:.3f}s over {stats['count']}"
+                    for provider, stats in latency.items()
+                )
+            )
+        return [
+            song
+            for rank in itertools.zip_longest(*results)
+            for song in rank
+            if song is not None
+        ]
@@ -1,70 +1,202 @@
 import asyncio
 import logging
-from typing import List, Union
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Tuple, Union
 
-import requests
+import constants
 from soundcloud import AlbumPlaylist, BasicTrack, SoundCloud, Track
+from soundcloud.resource.track import Transcoding
 
 from core.exceptions import ResolveException
 from patterns.singleton import SingletonMeta
-from utils import to_thread
+from utils.cache import TTLCache
+from utils.http import HttpClient
+from utils.scheduler import RequestScheduler
 
 _log = logging.getLogger(__name__)
 
+SEARCH_TRACKS_URL = "https://api-v2.soundcloud.com/search/tracks"
+MAX_TRACKS_PER_REQUEST = 50
+
+
+@dataclass(slots=True)
+class SearchPage:
+    """
+    A page of SoundCloud track search results.
+
+    Parameters:
+    - tracks (List[Track]): The tracks of the page.
+    - next_href (str | None): The URL of the next page, None on the last page.
+    """
+
+    tracks: List[Track]
+    next_href: Optional[str]
+
 
 class SoundCloudService(metaclass=SingletonMeta):
+    """
+    Non-blocking wrapper of the SoundCloud API.
+
+    Every request goes through a `RequestScheduler`, which bounds the number of
+    requests in flight and their rate, and retries the throttled ones, so bulk
+    lookups don't get the client ID rate limited.
+    """
+
     def __init__(self) -> None:
         self.sc = SoundCloud()
         self.client_id = self.sc.client_id
+        self.scheduler = RequestScheduler(
+            "soundcloud",
+            concurrency=constants.SOUNDCLOUD_REQUEST_CONCURRENCY,
+            rate=constants.SOUNDCLOUD_REQUEST_RATE,
+            burst=constants.SOUNDCLOUD_REQUEST_BURST,
+            max_retries=constants.SOUNDCLOUD_REQUEST_RETRIES,
+        )
+        # Search pages by (query, page number).
+        self._search_pages: TTLCache[Tuple[str, int], SearchPage] = TTLCache(
+            maxsize=constants.SOUNDCLOUD_SEARCH_CACHE_SIZE,
+            ttl=constants.SEARCH_CACHE_TTL,
+        )
+
+    async def __fetch_search_page(
+        self, query: str, next_href: Optional[str]
+    ) -> SearchPage:
+        if next_href is None:
+            url = SEARCH_TRACKS_URL
+            params = {"q": query, "limit": constants.SOUNDCLOUD_SEARCH_PAGE_SIZE}
+        else:
+            # The next page URL has every parameter but the client ID.
+            url, params = next_href, {}
+        params["client_id"] = self.client_id
+        data = await HttpClient().get_json(
+            url, headers=self.sc._get_default_headers(), params=params
+        )
 
-    @to_thread
-    def search(self, query: str):
-        _log.debug(f"Searching for: '{query}'")
-        return self.sc.search(query)
+        # The track search only returns tracks, no users or playlists.
+        tracks = []
+        for item in data.get("collection", []):
+            try:
+                tracks.append(Track.from_dict(item))
+            except Exception:
+                # Results the library can't read (e.g. missing fields) are skipped.
+                continue
+        return SearchPage(tracks=tracks, next_href=data.get("next_href"))
 
-    @to_thread
-    def resolve_url(self, url: str):
-        r = self.sc.resolve(url)
+    async def __get_search_page(
+        self, query: str, number: int, next_href: Optional[str]
+    ) -> SearchPage:
+        key = (query, number)
+        page = self._search_pages.get(key)
+        if page is None:
+            _log.debug(f"Searching for: '{query}', page {number}")
+            page = await self.scheduler.run(self.__fetch_search_page, query, next_href)
+            self._search_pages.set(key, page)
+        return page
+
+    async def search(self, query: str) -> AsyncIterator[Track]:
+        """
+        Search tracks, page by page.
+
+        Pages are fetched with the shared `HttpClient`, through the request scheduler
+        of SoundCloud, and cached for every guild. Once half of a page has been read,
+        the next page is fetched in the background, so a caller reading many results
+        rarely waits, and one reading a few results fetches a single page. Stop
+        reading by closing the iterator (`aclose`), which cancels the page being
+        fetched ahead.
+
+        Args:
+            query (str): The search query.
+
+        Yields:
+            Track: The tracks found, in order, until the last page.
+        """
+        number = 0
+        page = await self.__get_search_page(query, 0, None)
+        next_page: Optional[asyncio.Task] = None
+        try:
+            while True:
+                half = len(page.tracks) // 2
+                for i, track in enumerate(page.tracks):
+                    if i >= half and next_page is None and page.next_href:
+                        next_page = asyncio.create_task(
+                            self.__get_search_page(query, number + 1, page.next_href)
+                        )
+                    yield track
+                if next_page is None:
+                    if not page.next_href:
+                        return
+                    # Empty page with a next page.
+                    next_page = asyncio.create_task(
+                        self.__get_search_page(query, number + 1, page.next_href)
+                    )
+                page = await next_page
+                next_page = None
+                number += 1
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def resolve_url(self, url: str):
+        r = await self.scheduler.run(self.sc.resolve, url)
         _log.debug(f"Resolved URL: '{url}'. Type: {type(r)}")
         return r
 
+    async def get_track(self, track_id: int) -> Optional[Track]:
+        return await self.scheduler.run(self.sc.get_track, track_id)
+
     def get_thumbnail(self, track: Union[Track, BasicTrack]) -> str:
         return track.artwork_url or track.user.avatar_url
 
-    @to_thread
-    def get_playback_url(self, track: Union[Track, BasicTrack]):
-        # Transcoding involves 3 types of protocols: HLS, progressive and Opus.
-        # We prefer to use the 'HLS' protocol because it's the best for streaming.
-        stream_url = track.media.transcodings[0].url
-        track_authorization = track.track_authorization
+    async def get_playback_url(
+        self,
+        track: Union[Track, BasicTrack],
+        transcoding: Optional[Transcoding] = None,
+    ) -> str:
+        # Transcodings come in 2 protocols (HLS and progressive) and several codecs
+        # (opus, mp3, aac). The caller picks one with `cogs.music.core.stream`,
+        # default to the first one.
+        transcoding = transcoding or track.media.transcodings[0]
+        url = await self.scheduler.run(
+            self.__fetch_playback_url, transcoding.url, track.track_authorization
+        )
+        _log.debug(f"Got playback URL for: '{track.title}'")
+        return url
+
+    async def __fetch_playback_url(
+        self, stream_url: str, track_authorization: str
+    ) -> str:
         params = {
             "client_id": self.client_id,
             "track_authorization": track_authorization,
         }
-        response = requests.get(
+        data = await HttpClient().get_json(
             stream_url, headers=self.sc._get_default_headers(), params=params
         )
-        response.raise_for_status()
-        _log.debug(f"Got playback URL for: '{track.title}'")
-        return response.json()["url"]
+        return data["url"]
+
+    async def iter_tracks_info(
+        self, track_ids: List[int]
+    ) -> AsyncIterator[List[BasicTrack]]:
+        """
+        Get tracks from track IDs, 50 per request, and yield each batch as soon as
+        its request finished, in any order.
 
-    @to_thread
-    def __get_tracks(self, track_ids: list[int]) -> List[BasicTrack]:
-        """Get tracks from track IDs. Maximum 50 tracks per request."""
-        return self.sc.get_tracks(track_ids)
+        Args:
+            track_ids (List[int]): The track IDs.
 
-    async def get_tracks_info(self, track_ids: list[int], **kwargs) -> List[BasicTrack]:
-        """Get tracks from track IDs. Recommended to use this method for getting tracks."""
-        MAX_TRACKS_PER_REQUEST = 50
+        Yields:
+            List[BasicTrack]: The tracks of a batch that were found.
+        """
         chunks = [
             track_ids[i : i + MAX_TRACKS_PER_REQUEST]
             for i in range(0, len(track_ids), MAX_TRACKS_PER_REQUEST)
         ]
-        tracks = []
-        r = await asyncio.gather(*[self.__get_tracks(chunk) for chunk in chunks])
-        for res in r:
-            tracks.extend(res)
-        return tracks
+        results = self.scheduler.map(self.sc.get_tracks, chunks)
+        try:
+            async for _, tracks in results:
+                yield tracks
+        finally:
+            await results.aclose()
 
     async def extract_song_from_url(self, url: str):
         resolve = await self.resolve_url(url)
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# The fields of a playlist track read by `CompactTrack`, as a Web API `fields` filter.
+TRACK_FIELDS = "track(id,name,duration_ms,artists(name),external_urls(spotify))"
+PLAYLIST_ITEMS_FIELDS = f"items({TRACK_FIELDS}),next,offset,total"
+PLAYLIST_FIELDS = f"id,name,type,tracks({PLAYLIST_ITEMS_FIELDS})"
+
+
+@dataclass(slots=True)
+class CompactTrack:
+    """
+    The fields of a Spotify track the queue needs, read straight from the JSON
+    without building the full model (album, images, external IDs...). Use
+    `SpotifyService.get_track` for the full model.
+
+    Parameters:
+    - id (str): The track ID.
+    - name (str): The track name.
+    - duration_ms (int): The duration in milliseconds.
+    - artists (Tuple[str, ...]): The artist names.
+    - url (str | None): The Spotify URL of the track.
+    """
+
+    id: str
+    name: str
+    duration_ms: int
+    artists: Tuple[str, ...]
+    url: Optional[str]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactTrack":
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            duration_ms=data["duration_ms"],
+            artists=tuple(artist["name"] for artist in data.get("artists", ())),
+            url=data.get("external_urls", {}).get("spotify"),
+        )
+
+
+@dataclass(slots=True)
+class CompactTracks:
+    """
+    A page of the tracks of a playlist or album.
+
+    Parameters:
+    - items (List[CompactTrack]): The tracks. Removed playlist tracks and local
+      files (which have no ID) are left out.
+    - count (int): The number of rows of the page, including the ones left out.
+      The next page starts at `offset + count`.
+    - next (str | None): The URL of the next page, None on the last page.
+    - offset (int): The index of the first track of the page.
+    - total (int): The number of tracks of the playlist or album.
+    """
+
+    items: List[CompactTrack]
+    count: int
+    next: Optional[str]
+    offset: int
+    total: int
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], wrapped: bool = False) -> "CompactTracks":
+        """
+        Args:
+            data (Dict[str, Any]): A page of tracks.
+            wrapped (bool): The items wrap the track, as in playlists ({"track": ...}).
+        """
+        rows = data["items"]
+        items = []
+        for item in rows:
+            track = item.get("track") if wrapped else item
+            # Local files can't be played or told apart without an ID.
+            if track and track.get("id"):
+                items.append(CompactTrack.from_dict(track))
+        return cls(
+            items=items,
+            count=len(rows),
+            next=data.get("next"),
+            offset=data.get("offset", 0),
+            total=data.get("total", len(rows)),
+        )
+
+
+@dataclass(slots=True)
+class CompactCollection:
+    """
+    A playlist or album with the first page of its tracks.
+
+    Parameters:
+    - type (str): "playlist" or "album".
+    - id (str): The playlist or album ID.
+    - name (str): The name.
+    - tracks (CompactTracks): The first page of tracks.
+    """
+
+    type: str
+    id: str
+    name: str
+    tracks: CompactTracks
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactCollection":
+        return cls(
+            type=data["type"],
+            id=data["id"],
+            name=data["name"],
+            tracks=CompactTracks.from_dict(
+                data["tracks"], wrapped=data["type"] == "playlist"
+            ),
+        )
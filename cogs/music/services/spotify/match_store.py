@@ -0,0 +1,105 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import constants
+from patterns.singleton import SingletonMeta
+from utils.executor import in_executor
+
+_log = logging.getLogger(__name__)
+
+
+class Match(NamedTuple):
+    video_id: str
+    confidence: float
+    matched_at: int
+
+
+class MatchStore(metaclass=SingletonMeta):
+    """
+    Persistent store of the YouTube video chosen to play a Spotify track, so a track
+    is only searched on YouTube once.
+
+    Matches are kept in an SQLite database under `DATA_FOLDER`. Queries run in
+    `ProviderExecutor`, never on the event loop.
+    """
+
+    def __init__(self, path: str = constants.SPOTIFY_MATCH_DB) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS spotify_youtube_match (
+                    spotify_track_id TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    matched_at INTEGER NOT NULL
+                )
+                """
+            )
+
+    @in_executor("storage")
+    def get(self, spotify_track_id: str) -> Optional[Match]:
+        """
+        Get the YouTube video matched to a Spotify track.
+
+        Matches older than `SPOTIFY_MATCH_MAX_AGE` or less confident than
+        `SPOTIFY_MATCH_MIN_CONFIDENCE` are ignored, so the track is searched again.
+
+        Args:
+            spotify_track_id (str): The Spotify track ID.
+
+        Returns:
+            Match | None: The match, or None if there is no usable match.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id, confidence, matched_at FROM spotify_youtube_match "
+                "WHERE spotify_track_id = ?",
+                (spotify_track_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        match = Match(*row)
+        if (
+            match.matched_at < time.time() - constants.SPOTIFY_MATCH_MAX_AGE
+            or match.confidence < constants.SPOTIFY_MATCH_MIN_CONFIDENCE
+        ):
+            return None
+        return match
+
+    @in_executor("storage")
+    def put(self, spotify_track_id: str, video_id: str, confidence: float) -> None:
+        """
+        Save the YouTube video matched to a Spotify track, replacing any previous match.
+
+        Args:
+            spotify_track_id (str): The Spotify track ID.
+            video_id (str): The YouTube video ID.
+            confidence (float): How well the video matches the track, from 0 to 1.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spotify_youtube_match VALUES (?, ?, ?, ?)",
+                (spotify_track_id, video_id, confidence, int(time.time())),
+            )
+
+    @in_executor("storage")
+    def invalidate(self, spotify_track_id: str) -> None:
+        """
+        Forget the match of a Spotify track, e.g. because the video became unavailable.
+
+        Args:
+            spotify_track_id (str): The Spotify track ID.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM spotify_youtube_match WHERE spotify_track_id = ?",
+                (spotify_track_id,),
+            )
+        _log.info(f"Invalidated the YouTube match of Spotify track '{spotify_track_id}'.")
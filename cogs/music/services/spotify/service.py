@@ -1,23 +1,73 @@
+import asyncio
 import urllib.parse
+from collections import deque
+from typing import AsyncIterator, Deque, List, Union
 
+import requests
 import spotipy
+from cogs.music.services.spotify import album, playlist
 from cogs.music.services.spotify.album import Album, load_album
+from cogs.music.services.spotify.compact import (
+    PLAYLIST_FIELDS,
+    PLAYLIST_ITEMS_FIELDS,
+    CompactCollection,
+    CompactTrack,
+    CompactTracks,
+)
 from cogs.music.services.spotify.playlist import Playlist, load_playlist
 from cogs.music.services.spotify.search import load_search
 from cogs.music.services.spotify.spotify_type import SpotifyType
 from cogs.music.services.spotify.track import Track, load_track
+import constants
 from patterns.singleton import SingletonMeta
+from requests.adapters import HTTPAdapter
+from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.oauth2 import SpotifyClientCredentials
+from urllib3.util.retry import Retry
+from utils.executor import in_executor
+
+MAX_TRACKS_PER_REQUEST = 50
+PLAYLIST_PAGE_SIZE = 100
+ALBUM_PAGE_SIZE = 50
 
 
 class SpotifyService(metaclass=SingletonMeta):
+    """
+    Non-blocking wrapper of the Spotify Web API.
+
+    spotipy calls run in `ProviderExecutor`. They share one keep-alive connection pool
+    sized to the Spotify concurrency limit, and the client-credentials token is kept in
+    memory instead of being read from the `.cache` file on every request.
+    """
 
     def __init__(self, market: str = "VN", language: str = "vi") -> None:
-        self.auth_manager = SpotifyClientCredentials()
-        self.sp = spotipy.Spotify(auth_manager=self.auth_manager)
+        self.session = self.__build_session()
+        self.auth_manager = SpotifyClientCredentials(
+            requests_session=self.session, cache_handler=MemoryCacheHandler()
+        )
+        self.sp = spotipy.Spotify(
+            auth_manager=self.auth_manager, requests_session=self.session
+        )
         self.market = market
         self.language = language
 
+    @staticmethod
+    def __build_session() -> requests.Session:
+        pool_size = constants.PROVIDER_CONCURRENCY.get(
+            "spotify", constants.PROVIDER_DEFAULT_CONCURRENCY
+        )
+        retry = Retry(
+            total=3,
+            read=False,
+            allowed_methods=frozenset(["GET", "POST"]),
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        return session
+
     def __get_type(self, url: str):
         path = urllib.parse.urlparse(url).path
         path = path.split("/")
@@ -35,7 +85,8 @@ class SpotifyService(metaclass=SingletonMeta):
         playlist = self.sp.playlist(url, market=self.market)
         return load_playlist(playlist)  # type: ignore
 
-    async def resolve_url(self, url: str):
+    @in_executor("spotify")
+    def resolve_url(self, url: str):
         type_ = self.__get_type(url)
         if type_ == SpotifyType.ALBUM.value:
             return self.__resolve_album(url)
@@ -46,24 +97,165 @@ class SpotifyService(metaclass=SingletonMeta):
         else:
             raise ValueError(f"Invalid Spotify URL: {url}")
 
+    @in_executor("spotify")
+    def resolve_compact(self, url: str) -> Union[CompactTrack, CompactCollection]:
+        """
+        Like `resolve_url`, but only read the fields the queue needs, see `CompactTrack`.
+        Playlists are requested with a `fields` filter, so the rest isn't even sent.
+
+        Raises:
+            ValueError: The URL is not a Spotify track, album or playlist.
+        """
+        type_ = self.__get_type(url)
+        if type_ == SpotifyType.ALBUM.value:
+            return CompactCollection.from_dict(self.sp.album(url, market=self.market))  # type: ignore
+        elif type_ == SpotifyType.TRACK.value:
+            return CompactTrack.from_dict(self.sp.track(url, market=self.market))  # type: ignore
+        elif type_ == SpotifyType.PLAYLIST.value:
+            playlist = self.sp.playlist(url, fields=PLAYLIST_FIELDS, market=self.market)
+            return CompactCollection.from_dict(playlist)  # type: ignore
+        else:
+            raise ValueError(f"Invalid Spotify URL: {url}")
+
+    @in_executor("spotify")
     def get_track(self, track_id: str) -> Track:
         track = self.sp.track(track_id, market=self.market)
         return load_track(track)  # type: ignore
 
+    @in_executor("spotify")
+    def __get_tracks(self, track_ids: List[str]) -> List[Track]:
+        """Get tracks from track IDs. Maximum 50 tracks per request."""
+        tracks = self.sp.tracks(track_ids, market=self.market)["tracks"]  # type: ignore
+        # Unknown IDs come back as null.
+        return [load_track(track) for track in tracks if track is not None]
+
+    async def get_tracks(self, track_ids: List[str]) -> List[Track]:
+        """
+        Get many tracks, 50 per request. The requests run concurrently, bounded by the
+        Spotify concurrency limit.
+
+        Args:
+            track_ids (List[str]): The track IDs.
+
+        Returns:
+            List[Track]: The tracks that were found.
+        """
+        chunks = [
+            track_ids[i : i + MAX_TRACKS_PER_REQUEST]
+            for i in range(0, len(track_ids), MAX_TRACKS_PER_REQUEST)
+        ]
+        tracks: List[Track] = []
+        for chunk in await asyncio.gather(*(self.__get_tracks(c) for c in chunks)):
+            tracks.extend(chunk)
+        return tracks
+
+    @in_executor("spotify")
     def get_album(self, album_id: str) -> Album:
         album = self.sp.album(album_id, market=self.market)
         return load_album(album)  # type: ignore
 
+    @in_executor("spotify")
     def get_playlist(self, playlist_id: str) -> Playlist:
         playlist = self.sp.playlist(playlist_id, market=self.market)
         return load_playlist(playlist)  # type: ignore
 
+    @in_executor("spotify")
     def search(
         self, query: str, type_: str = SpotifyType.TRACK.value, limit: int = 1
     ):
         search = self.sp.search(query, limit=limit, type=type_, market=self.market)
         return load_search(search)  # type: ignore
 
-    # async def get_playback_url(self, track: Track) -> str:
-    #     result = await ExtractorFactory.get_extractor("youtube").get_data(track.name, None, True, 1)
-    #     return result[0].
+    @in_executor("spotify")
+    def __get_playlist_page(self, playlist_id: str, offset: int) -> playlist.Tracks:
+        page = self.sp.playlist_items(
+            playlist_id,
+            limit=PLAYLIST_PAGE_SIZE,
+            offset=offset,
+            market=self.market,
+            additional_types=("track",),
+        )
+        return playlist.Tracks.from_dict(page)  # type: ignore
+
+    @in_executor("spotify")
+    def __get_album_page(self, album_id: str, offset: int) -> album.Tracks:
+        page = self.sp.album_tracks(
+            album_id, limit=ALBUM_PAGE_SIZE, offset=offset, market=self.market
+        )
+        return album.Tracks.from_dict(page)  # type: ignore
+
+    @in_executor("spotify")
+    def __get_compact_playlist_page(self, playlist_id: str, offset: int) -> CompactTracks:
+        page = self.sp.playlist_items(
+            playlist_id,
+            fields=PLAYLIST_ITEMS_FIELDS,
+            limit=PLAYLIST_PAGE_SIZE,
+            offset=offset,
+            market=self.market,
+            additional_types=("track",),
+        )
+        return CompactTracks.from_dict(page, wrapped=True)  # type: ignore
+
+    @in_executor("spotify")
+    def __get_compact_album_page(self, album_id: str, offset: int) -> CompactTracks:
+        page = self.sp.album_tracks(
+            album_id, limit=ALBUM_PAGE_SIZE, offset=offset, market=self.market
+        )
+        return CompactTracks.from_dict(page)  # type: ignore
+
+    async def iter_tracks(
+        self, data: Union[Playlist, Album, CompactCollection]
+    ) -> AsyncIterator[List[Union[playlist.Track, album.Track, CompactTrack]]]:
+        """
+        Iterate over every track of a playlist or album, page by page.
+
+        The first page is the one embedded in `data`. The following pages are
+        fetched concurrently, at most `SPOTIFY_PAGE_READ_AHEAD` at a time, and are
+        yielded in playlist order as soon as they arrive.
+
+        Args:
+            data (Playlist | Album | CompactCollection): A playlist or album returned
+                by `resolve_url`, or by `resolve_compact` to get `CompactTrack`s.
+
+        Yields:
+            List[Track]: The tracks of a page. Removed playlist tracks are skipped.
+        """
+        if isinstance(data, CompactCollection):
+            if data.type == SpotifyType.PLAYLIST.value:
+                get_page, page_size = self.__get_compact_playlist_page, PLAYLIST_PAGE_SIZE
+            else:
+                get_page, page_size = self.__get_compact_album_page, ALBUM_PAGE_SIZE
+        elif isinstance(data, Playlist):
+            get_page, page_size = self.__get_playlist_page, PLAYLIST_PAGE_SIZE
+        else:
+            get_page, page_size = self.__get_album_page, ALBUM_PAGE_SIZE
+
+        def tracks_of(page) -> List[Union[playlist.Track, album.Track, CompactTrack]]:
+            if isinstance(page, playlist.Tracks):
+                return [item.track for item in page.items if item.track is not None]
+            # Compact pages have already left out the removed tracks.
+            return list(page.items)
+
+        first = data.tracks
+        yield tracks_of(first)
+        if first.next is None:
+            return
+
+        # Compact pages leave out some rows, count the rows Spotify returned.
+        rows = first.count if isinstance(first, CompactTracks) else len(first.items)
+        offsets = iter(range(first.offset + rows, first.total, page_size))
+        pending: Deque[asyncio.Task] = deque()
+        try:
+            for offset in offsets:
+                pending.append(asyncio.create_task(get_page(data.id, offset)))
+                if len(pending) >= constants.SPOTIFY_PAGE_READ_AHEAD:
+                    break
+            while pending:
+                page = await pending.popleft()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(asyncio.create_task(get_page(data.id, offset)))
+                yield tracks_of(page)
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,240 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from patterns.singleton import SingletonMeta
+from pytubefix import Playlist, Search
+from pytubefix.innertube import InnerTube
+from utils.executor import in_executor
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ListedVideo:
+    """
+    A video as listed in a playlist page or in search results.
+
+    Parameters:
+    - video_id (str): The ID of the video.
+    - title (str | None): The title, None if the listing doesn't have it (e.g. shorts).
+    - duration_ms (int): The duration in milliseconds, 0 if unknown (e.g. live streams).
+    - author (str | None): The channel name, None if unknown.
+    """
+
+    video_id: str
+    title: Optional[str]
+    duration_ms: int
+    author: Optional[str]
+
+    @property
+    def watch_url(self) -> str:
+        return f"https://www.youtube.com/watch?v={self.video_id}"
+
+
+@dataclass(slots=True)
+class PlaylistPage:
+    """
+    A page of up to 100 videos of a playlist.
+
+    Parameters:
+    - title (str | None): The title of the playlist.
+    - videos (List[ListedVideo]): The videos of the page.
+    - continuation (str | None): The token of the next page, None on the last page.
+    - visitor_data (str | None): Sent back with the continuation token.
+    """
+
+    title: Optional[str]
+    videos: List[ListedVideo]
+    continuation: Optional[str]
+    visitor_data: Optional[str]
+
+
+def _text(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Read a YouTube text object, either {"simpleText": ...} or {"runs": [...]}."""
+    if not value:
+        return None
+    if "simpleText" in value:
+        return value["simpleText"]
+    runs = value.get("runs")
+    return "".join(run.get("text", "") for run in runs) if runs else None
+
+
+def _parse_length(text: Optional[str]) -> int:
+    """Convert a length text such as "1:02:03" to milliseconds, 0 if it can't be read."""
+    if not text:
+        return 0
+    seconds = 0
+    for part in text.split(":"):
+        if not part.isdigit():
+            return 0
+        seconds = seconds * 60 + int(part)
+    return seconds * 1000
+
+
+def _parse_playlist_items(items: Iterable[Dict[str, Any]]) -> List[ListedVideo]:
+    videos = []
+    for item in items:
+        if "playlistVideoRenderer" in item:
+            renderer = item["playlistVideoRenderer"]
+            if not renderer.get("isPlayable", True):
+                # Deleted or private video.
+                continue
+            seconds = renderer.get("lengthSeconds")
+            videos.append(
+                ListedVideo(
+                    video_id=renderer["videoId"],
+                    title=_text(renderer.get("title")),
+                    duration_ms=(
+                        int(seconds) * 1000
+                        if seconds
+                        else _parse_length(_text(renderer.get("lengthText")))
+                    ),
+                    author=_text(renderer.get("shortBylineText")),
+                )
+            )
+        elif "richItemRenderer" in item:
+            # Shorts only carry their ID, the rest is hydrated later.
+            content = item["richItemRenderer"].get("content", {})
+            try:
+                if "shortsLockupViewModel" in content:
+                    video_id = content["shortsLockupViewModel"]["onTap"][
+                        "innertubeCommand"
+                    ]["reelWatchEndpoint"]["videoId"]
+                else:
+                    video_id = content["reelItemRenderer"]["videoId"]
+            except KeyError:
+                continue
+            videos.append(ListedVideo(video_id, None, 0, None))
+    return videos
+
+
+def _split_continuation(
+    items: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    if items and "continuationItemRenderer" in items[-1]:
+        token = items[-1]["continuationItemRenderer"]["continuationEndpoint"][
+            "continuationCommand"
+        ]["token"]
+        return items[:-1], token
+    return items, None
+
+
+class YouTubeService(metaclass=SingletonMeta):
+    """
+    Reads YouTube playlists and search results from their listing responses.
+
+    A playlist page or a search response already has the ID, title, length and
+    channel of every video, so listing N videos costs one request per page instead
+    of one watch-page request per video. Anything else about a video is fetched
+    when it is hydrated or played.
+    """
+
+    @in_executor("youtube")
+    def search(self, query: str, limit: int = 1) -> List[ListedVideo]:
+        """
+        Search videos. Only the first page of results is read.
+
+        Args:
+            query (str): The search query.
+            limit (int): The maximum number of videos.
+
+        Returns:
+            List[ListedVideo]: The videos found, at most `limit`.
+        """
+        raw = Search(query, client="WEB").fetch_query()
+        try:
+            sections = raw["contents"]["twoColumnSearchResultsRenderer"][
+                "primaryContents"
+            ]["sectionListRenderer"]["contents"]
+        except KeyError:
+            _log.warning(f"Unexpected YouTube search response for '{query}'.")
+            return []
+
+        videos: List[ListedVideo] = []
+        for section in sections:
+            for item in section.get("itemSectionRenderer", {}).get("contents", []):
+                renderer = item.get("videoRenderer")
+                if renderer is None:
+                    # Ads, shelves, playlists, channels...
+                    continue
+                videos.append(
+                    ListedVideo(
+                        video_id=renderer["videoId"],
+                        title=_text(renderer.get("title")),
+                        duration_ms=_parse_length(_text(renderer.get("lengthText"))),
+                        author=_text(renderer.get("ownerText")),
+                    )
+                )
+                if len(videos) >= limit:
+                    return videos
+        return videos
+
+    @in_executor("youtube")
+    def get_playlist(self, url: str) -> PlaylistPage:
+        """
+        Get the title and the first page of a playlist, from the playlist web page.
+
+        Args:
+            url (str): The playlist URL, or a watch URL with a `list` parameter.
+
+        Returns:
+            PlaylistPage: The first page.
+        """
+        playlist = Playlist(url, client="WEB")
+        data = playlist.initial_data
+        section_contents = data["contents"]["twoColumnBrowseResultsRenderer"][
+            "tabs"
+        ][0]["tabRenderer"]["content"]["sectionListRenderer"]["contents"]
+        items: List[Dict[str, Any]] = []
+        for section in section_contents:
+            for content in section.get("itemSectionRenderer", {}).get("contents", []):
+                renderer = content.get("playlistVideoListRenderer") or content.get(
+                    "richGridRenderer"
+                )
+                if renderer is not None:
+                    items = renderer.get("contents", [])
+                    break
+            if items:
+                break
+
+        items, continuation = _split_continuation(items)
+        visitor_data = (
+            data.get("responseContext", {})
+            .get("webResponseContextExtensionData", {})
+            .get("ytConfigData", {})
+            .get("visitorData")
+        )
+        return PlaylistPage(
+            title=playlist.title,
+            videos=_parse_playlist_items(items),
+            continuation=continuation,
+            visitor_data=visitor_data,
+        )
+
+    @in_executor("youtube")
+    def get_next_page(self, page: PlaylistPage) -> Optional[PlaylistPage]:
+        """
+        Get the page that follows `page`.
+
+        Returns:
+            PlaylistPage | None: The next page, None if `page` is the last one.
+        """
+        if page.continuation is None:
+            return None
+        raw = InnerTube("WEB").browse(
+            continuation=page.continuation, visitor_data=page.visitor_data
+        )
+        try:
+            items = raw["onResponseReceivedActions"][0][
+                "appendContinuationItemsAction"
+            ]["continuationItems"]
+        except (KeyError, IndexError):
+            return None
+        items, continuation = _split_continuation(items)
+        return PlaylistPage(
+            title=page.title,
+            videos=_parse_playlist_items(items),
+            continuation=continuation,
+            visitor_data=page.visitor_data,
+        )
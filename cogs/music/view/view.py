@@ -1,22 +1,82 @@
 import discord
-from typing import List, Callable, override
+from typing import List, Callable, Protocol, Union, override
 
 from cogs.music.core.song import SongMeta
+from utils import format_duration
+
+
+class TrackSource(Protocol):
+    """Tracks that `MusicView` reads one page at a time, e.g. a `PlayList`."""
+
+    # Changes whenever the tracks change.
+    version: int
+
+    def size(self) -> int: ...
+
+    def window(self, offset: int, limit: int) -> List[SongMeta]: ...
+
+    def __contains__(self, track: SongMeta) -> bool: ...
+
+
+class ListSource:
+    """A fixed list of tracks, e.g. search results."""
+
+    version = 0
+
+    def __init__(self, tracks: List[SongMeta]) -> None:
+        self.tracks = tracks
+
+    def size(self) -> int:
+        return len(self.tracks)
+
+    def window(self, offset: int, limit: int) -> List[SongMeta]:
+        return self.tracks[offset : offset + limit]
+
+    def __contains__(self, track: SongMeta) -> bool:
+        return any(t is track for t in self.tracks)
 
 
 class MusicView(discord.ui.View):
-    def __init__(self, tracks: List[SongMeta], callback: Callable, timeout: int = 60):
+    """
+    Pages through tracks and calls `callback` with the selected one.
+
+    Only the tracks of the page shown are read from the source. If the source
+    changes while the view is open, the page is read again when it is next shown,
+    and selecting a track that was removed in between is refused.
+    """
+
+    def __init__(
+        self,
+        tracks: Union[List[SongMeta], TrackSource],
+        callback: Callable,
+        timeout: int = 60,
+    ):
         super().__init__(timeout=timeout)
-        self.tracks = tracks
+        self.source: TrackSource = (
+            ListSource(tracks) if isinstance(tracks, list) else tracks
+        )
         self.callback = callback
         self.current_page = 0
         self.tracks_per_page = 5
-        self.total_pages = (len(tracks) - 1) // self.tracks_per_page + 1
+        self.page_tracks: List[SongMeta] = []
+        # Version of the source when `page_tracks` was read.
+        self.version = self.source.version
         self.message: discord.Message = None
 
         # Add selection buttons for each track on the page
         self.update_buttons()
 
+    @property
+    def total_pages(self) -> int:
+        return max((self.source.size() - 1) // self.tracks_per_page + 1, 1)
+
+    def load_page(self) -> None:
+        self.current_page = min(self.current_page, self.total_pages - 1)
+        self.page_tracks = self.source.window(
+            self.current_page * self.tracks_per_page, self.tracks_per_page
+        )
+        self.version = self.source.version
+
     def create_embed(self, is_timeout: bool = False) -> discord.Embed:
         if is_timeout:
             return discord.Embed(
@@ -25,9 +85,9 @@ class MusicView(discord.ui.View):
                 color=discord.Color.red(),
             )
 
-        start_idx = self.current_page * self.tracks_per_page
-        end_idx = min(start_idx + self.tracks_per_page, len(self.tracks))
-        current_tracks = self.tracks[start_idx:end_idx]
+        if self.source.version != self.version:
+            self.update_buttons()
+        current_tracks = self.page_tracks
 
         embed = discord.Embed(
             title="Search Results",
@@ -36,7 +96,11 @@ class MusicView(discord.ui.View):
         )
 
         for idx, track in enumerate(current_tracks, start=1):
-            duration = track.duration or "??:??"
+            duration = (
+                format_duration(track.duration_ms, unit="milliseconds")
+                if track.duration_ms
+                else "??:??"
+            )
             title = track.title or "Unknown"
             author = track.author or "Unknown"
             embed.add_field(
@@ -57,23 +121,31 @@ class MusicView(discord.ui.View):
         self.add_item(self.next_button)
 
         # Add selection buttons for current page
+        self.load_page()
         start_idx = self.current_page * self.tracks_per_page
-        end_idx = min(start_idx + self.tracks_per_page, len(self.tracks))
 
-        for i in range(start_idx, end_idx):
+        for i, track in enumerate(self.page_tracks):
             button = discord.ui.Button(
                 style=discord.ButtonStyle.green,
-                label=str(i - start_idx + 1),
-                custom_id=f"select_{i}",
+                label=str(i + 1),
+                custom_id=f"select_{start_idx + i}",
                 row=1,
             )
-            button.callback = lambda interaction, track_idx=i: self.select_track(
-                interaction, track_idx
+            button.callback = lambda interaction, track=track: self.select_track(
+                interaction, track
             )
             self.add_item(button)
 
-    async def select_track(self, interaction: discord.Interaction, track_idx: int):
-        selected_track = self.tracks[track_idx]
+    async def select_track(self, interaction: discord.Interaction, selected_track: SongMeta):
+        if self.source.version != self.version and selected_track not in self.source:
+            self.update_buttons()
+            await interaction.response.edit_message(
+                embed=self.create_embed(), view=self
+            )
+            await interaction.followup.send(
+                "This song is no longer in the list.", ephemeral=True
+            )
+            return
 
         for item in self.children:
             item.disabled = True
@@ -11,3 +11,74 @@ FFMPEG_OPTIONS = {
     "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5",
     "options": "-vn",
 }
+
+# Number of upcoming songs resolved in the background while a song is playing.
+PREFETCH_SIZE = 2
+
+# Maximum number of resolved songs shared between guilds.
+SONG_CACHE_SIZE = 512
+# Cached playback URLs are dropped this many seconds before they expire.
+PLAYBACK_URL_EXPIRY_MARGIN = 30 * 60
+
+# Play opus sources without decoding and re-encoding them.
+OPUS_PASSTHROUGH = True
+
+# Rank streams by startup latency (progressive before HLS) before decode cost.
+STREAM_PREFER_FAST_START = False
+
+# Threads for the blocking calls of music providers, and how many of them each
+# provider may use at once.
+PROVIDER_MAX_WORKERS = 16
+PROVIDER_DEFAULT_CONCURRENCY = 4
+PROVIDER_CONCURRENCY = {"youtube": 8, "soundcloud": 4, "spotify": 4}
+# Give up on a /play or /search query that takes longer than this (seconds).
+QUERY_TIMEOUT = 2 * 60
+# Number of Spotify playlist/album pages fetched ahead of the one being read.
+SPOTIFY_PAGE_READ_AHEAD = 4
+
+# Persistent data (databases) kept across restarts.
+DATA_FOLDER = CUR_PATH + r"/data"
+SPOTIFY_MATCH_DB = DATA_FOLDER + r"/spotify_matches.db"
+# Spotify to YouTube matches are searched again when older or less confident than this.
+SPOTIFY_MATCH_MAX_AGE = 30 * 24 * 60 * 60
+SPOTIFY_MATCH_MIN_CONFIDENCE = 0.5
+
+# Queue snapshots, so queues survive a restart.
+QUEUE_SNAPSHOT_DB = DATA_FOLDER + r"/queue_snapshots.db"
+# Changes to a queue are saved together after this many seconds.
+QUEUE_SNAPSHOT_DELAY = 2
+# Snapshots older than this are not restored.
+QUEUE_SNAPSHOT_MAX_AGE = 7 * 24 * 60 * 60
+
+# Results of text searches, shared between guilds.
+SEARCH_CACHE_SIZE = 1024
+# Text search results are searched again after this many seconds.
+SEARCH_CACHE_TTL = 30 * 60
+
+# Providers of text searches, in order of preference.
+SEARCH_PROVIDERS = ("youtube", "soundcloud")
+# Query every search provider at once instead of one after the other.
+SEARCH_FAN_OUT = True
+# Providers that didn't answer a text search after this many seconds are ignored.
+SEARCH_DEADLINE = 10
+
+# Tracks per SoundCloud search page; the next page is fetched once half of a page is read.
+SOUNDCLOUD_SEARCH_PAGE_SIZE = 20
+# SoundCloud search pages kept, shared between guilds.
+SOUNDCLOUD_SEARCH_CACHE_SIZE = 256
+
+# SoundCloud requests: at most this many at once, started at most at this rate
+# (per second, with bursts), retried this many times when throttled or failing.
+SOUNDCLOUD_REQUEST_CONCURRENCY = 3
+SOUNDCLOUD_REQUEST_RATE = 5
+SOUNDCLOUD_REQUEST_BURST = 10
+SOUNDCLOUD_REQUEST_RETRIES = 3
+
+# Shared HTTP client (utils.http): connection pool size, overall and per host,
+# seconds DNS lookups and idle connections are kept, request timeouts.
+HTTP_POOL_SIZE = 100
+HTTP_POOL_SIZE_PER_HOST = 10
+HTTP_DNS_CACHE_TTL = 5 * 60
+HTTP_KEEPALIVE_TIMEOUT = 60
+HTTP_TIMEOUT = 15
+HTTP_CONNECT_TIMEOUT = 5
@@ -1,46 +1,115 @@
-from dataclasses import dataclass, asdict
-from typing import Any, Union
+from dataclasses import dataclass, fields
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+# A function converting one field value, None if the value is kept as is.
+Converter = Optional[Callable[[Any], Any]]
+
+# The field converters of each class, built on first use, see `_decoders` and `_encoders`.
+_DECODERS: Dict[type, List[Tuple[str, Converter]]] = {}
+_ENCODERS: Dict[type, List[Tuple[str, Converter]]] = {}
+
+
+def _decoder(target_type: Any) -> Converter:
+    """Build the function converting a JSON value to `target_type`."""
+    if hasattr(target_type, "from_dict"):
+        # Looked up at call time, so classes can refer to themselves.
+        return lambda value: target_type.from_dict(value)
+    origin = get_origin(target_type)
+    if origin is list:
+        args = get_args(target_type)
+        item = _decoder(args[0]) if args else None
+        if item is None:
+            return list
+        return lambda value: [None if x is None else item(x) for x in value]
+    if origin is Union:  # Optional is Union[type, None]
+        return _decoder(get_args(target_type)[0])
+    return None
+
+
+def _encoder(target_type: Any) -> Converter:
+    """Build the function converting a value of `target_type` to JSON."""
+    if hasattr(target_type, "to_dict"):
+        return lambda value: value.to_dict()
+    origin = get_origin(target_type)
+    if origin is list:
+        args = get_args(target_type)
+        item = _encoder(args[0]) if args else _encode_any
+        if item is None:
+            return list
+        return lambda value: [None if x is None else item(x) for x in value]
+    if origin is dict:
+        return _encode_any
+    if origin is Union:
+        return _encoder(get_args(target_type)[0])
+    if target_type is Any:
+        return _encode_any
+    return None
+
+
+def _encode_any(obj: Any) -> Any:
+    """Convert a value whose type is not declared precisely."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    elif isinstance(obj, list):
+        return [_encode_any(x) for x in obj]
+    elif isinstance(obj, dict):
+        return {k: _encode_any(v) for k, v in obj.items()}
+    else:
+        return obj
+
+
+def _decoders(cls: type) -> List[Tuple[str, Converter]]:
+    converters = _DECODERS.get(cls)
+    if converters is None:
+        hints = get_type_hints(cls)
+        converters = [(f.name, _decoder(hints[f.name])) for f in fields(cls)]
+        _DECODERS[cls] = converters
+    return converters
+
+
+def _encoders(cls: type) -> List[Tuple[str, Converter]]:
+    converters = _ENCODERS.get(cls)
+    if converters is None:
+        hints = get_type_hints(cls)
+        converters = [(f.name, _encoder(hints[f.name])) for f in fields(cls)]
+        _ENCODERS[cls] = converters
+    return converters
 
 
 # Base class for JSON serialization
 @dataclass
 class JsonObject:
+    """
+    Base class of dataclasses read from and written to JSON.
+
+    The type hints of a class are resolved once, into one converter per field, on
+    the first `from_dict` or `to_dict` of the class. Later calls only run the
+    converters.
+    """
+
     def to_dict(self) -> dict:
-        def _convert(obj):
-            if hasattr(obj, "to_dict"):
-                return obj.to_dict()
-            elif isinstance(obj, list):
-                return [_convert(x) for x in obj]
-            elif isinstance(obj, dict):
-                return {k: _convert(v) for k, v in obj.items()}
-            else:
-                return obj
-
-        return {k: _convert(v) for k, v in asdict(self).items()}
+        result = {}
+        for name, encode in _encoders(type(self)):
+            value = getattr(self, name)
+            result[name] = value if encode is None or value is None else encode(value)
+        return result
 
     @classmethod
     def from_dict(cls, data: dict) -> "JsonObject":
-        field_types = {f.name: f.type for f in cls.__dataclass_fields__.values()}
-
-        def _convert(value: Any, target_type: Any) -> Any:
-            if value is None:
-                return None
-            if hasattr(target_type, "from_dict"):
-                return target_type.from_dict(value)
-            if hasattr(target_type, "__origin__"):  # Handle List, Dict, Optional
-                if target_type.__origin__ is list:
-                    item_type = target_type.__args__[0]
-                    return [_convert(item, item_type) for item in value]
-                if target_type.__origin__ is dict:
-                    return value
-                if target_type.__origin__ is Union:  # Optional is Union[type, None]
-                    inner_type = target_type.__args__[0]
-                    return _convert(value, inner_type)
-            return value
-
-        kwargs = {
-            key: _convert(value, field_types[key])
-            for key, value in data.items()
-            if key in field_types
-        }
+        kwargs = {}
+        for name, decode in _decoders(cls):
+            if name in data:
+                value = data[name]
+                kwargs[name] = value if decode is None or value is None else decode(value)
         return cls(**kwargs)
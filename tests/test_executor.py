@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+import constants
+import pytest
+from utils.executor import run_blocking
+
+# Blocking work of the fake provider, in seconds.
+SLOW_CALL = 0.5
+# The loop must never stall longer than this while providers block.
+MAX_LOOP_LAG = 0.1
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """The longest delay of a timer on the loop until `stop` is set."""
+    lag = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(lag, time.perf_counter() - start - interval)
+    return lag
+
+
+def test_slow_provider_does_not_block_the_loop() -> None:
+    async def main() -> float:
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(_measure_loop_lag(stop))
+        await asyncio.gather(
+            *(
+                run_blocking("slow-lag", time.sleep, SLOW_CALL)
+                for _ in range(constants.PROVIDER_DEFAULT_CONCURRENCY)
+            )
+        )
+        stop.set()
+        return await monitor
+
+    assert asyncio.run(main()) < MAX_LOOP_LAG
+
+
+def test_wait_for_times_out_on_slow_provider() -> None:
+    async def main() -> float:
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(run_blocking("slow-timeout", time.sleep, SLOW_CALL), 0.05)
+        return time.perf_counter() - start
+
+    # The caller gets the timeout without waiting for the blocking call to end.
+    assert asyncio.run(main()) < SLOW_CALL
+
+
+def test_cancelled_call_waiting_for_a_slot_never_runs() -> None:
+    started = threading.Event()
+
+    def late() -> None:
+        started.set()
+
+    async def main() -> None:
+        # Take every slot of the provider.
+        busy = [
+            asyncio.create_task(run_blocking("slow-cancel", time.sleep, SLOW_CALL))
+            for _ in range(constants.PROVIDER_DEFAULT_CONCURRENCY)
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(run_blocking("slow-cancel", late), 0.05)
+        await asyncio.gather(*busy)
+        # The slots are free again: a cancelled call must not have taken one.
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert not started.is_set()
@@ -0,0 +1,55 @@
+import asyncio
+from typing import List
+
+import pytest
+from cogs.music.core import prefetch
+from cogs.music.core.playlist import PlayList
+from cogs.music.core.song import SongMeta, SpotifySongMeta
+from core.exceptions import MusicException
+
+
+def _spotify(track_id: str) -> SpotifySongMeta:
+    return SpotifySongMeta(
+        title=f"Track {track_id}",
+        duration_ms=200_000,
+        playlist_name=None,
+        webpage_url=f"https://open.spotify.com/track/{track_id}",
+        author="Artist",
+        requester_id=1,
+        track_id=track_id,
+    )
+
+
+def test_unresolved_spotify_song_raises_music_exception(monkeypatch) -> None:
+    async def unresolved(song_meta: SongMeta) -> None:
+        return None
+
+    monkeypatch.setattr(prefetch, "createSong", unresolved)
+
+    async def main() -> None:
+        playlist = PlayList()
+        playlist.restore([_spotify("missing")])
+        with pytest.raises(MusicException, match="Spotify"):
+            await playlist.get_next_prepared()
+
+    asyncio.run(main())
+
+
+def test_unresolved_spotify_song_is_skipped(monkeypatch) -> None:
+    resolved: List[str] = []
+
+    async def resolve(song_meta: SpotifySongMeta) -> object:
+        resolved.append(song_meta.track_id)
+        return None if song_meta.track_id == "missing" else song_meta
+
+    monkeypatch.setattr(prefetch, "createSong", resolve)
+
+    async def main() -> None:
+        playlist = PlayList()
+        playable = _spotify("playable")
+        playlist.restore([_spotify("missing"), playable])
+        assert await playlist.get_next_prepared() is playable
+        assert playlist.size() == 0
+
+    asyncio.run(main())
+    assert "missing" in resolved
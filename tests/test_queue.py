@@ -0,0 +1,71 @@
+import random
+from typing import List
+
+from cogs.music.core.queue import IndexedQueue
+
+
+class Item:
+    def __init__(self, weight: int) -> None:
+        self.weight = weight
+
+
+def _check(queue: IndexedQueue, expected: List[Item]) -> None:
+    assert list(queue) == expected
+    assert len(queue) == len(expected)
+    total = 0
+    for i, item in enumerate(expected):
+        assert queue.get_at(i) is item
+        assert queue.index(item) == i
+        assert queue.weight_before(i) == total
+        total += item.weight
+    assert queue.weight_before() == total
+
+
+def test_matches_a_list() -> None:
+    rng = random.Random(0)
+    queue: IndexedQueue[Item] = IndexedQueue()
+    expected: List[Item] = []
+    for _ in range(1000):
+        op = rng.random()
+        if op < 0.3:
+            items = [Item(rng.randint(1, 9)) for _ in range(rng.randint(1, 5))]
+            index = rng.randint(0, len(expected))
+            queue.insert_many(index, items, [x.weight for x in items])
+            expected[index:index] = items
+        elif op < 0.45:
+            item = Item(rng.randint(1, 9))
+            index = rng.randint(0, len(expected))
+            queue.insert(index, item, item.weight)
+            expected.insert(index, item)
+        elif op < 0.6:
+            item = Item(rng.randint(1, 9))
+            queue.append(item, item.weight)
+            expected.append(item)
+        elif op < 0.8 and expected:
+            index = rng.randrange(len(expected))
+            assert queue.remove_at(index) is expected.pop(index)
+        else:
+            assert queue.popleft() is (expected.pop(0) if expected else None)
+        _check(queue, expected)
+
+
+def test_pages_played_next_fill_the_free_slots() -> None:
+    items = [Item(1) for _ in range(1000)]
+    queue: IndexedQueue[Item] = IndexedQueue()
+    queue.extend(items, [1] * len(items))
+
+    expected = list(items)
+    first = Item(1)
+    queue.insert_many(11, [first], [1])  # Rebuilds, with free slots after the item.
+    expected.insert(11, first)
+    after = first
+    slots = queue._slots
+    for _ in range(50):
+        page = [Item(1) for _ in range(10)]
+        index = queue.index(after) + 1
+        queue.insert_many(index, page, [1] * len(page))
+        expected[index:index] = page
+        after = page[-1]
+    # No rebuild: the pages went into the free slots.
+    assert queue._slots is slots
+    _check(queue, expected)
@@ -0,0 +1,36 @@
+import asyncio
+import gc
+from typing import List
+
+import constants
+from cogs.music.search import Search
+
+
+def test_first_wins_retrieves_errors_of_cancelled_providers(monkeypatch) -> None:
+    first = constants.SEARCH_PROVIDERS[0]
+
+    async def timed_search(self, provider: str, query: str, ctx, limit: int) -> List[str]:
+        if provider == first:
+            return ["song"]
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            # e.g. a client that fails while closing its connection.
+            raise RuntimeError(f"{provider} is down")
+        return []
+
+    monkeypatch.setattr(Search, "_Search__timed_search", timed_search)
+    unhandled: List[dict] = []
+
+    async def main() -> List[str]:
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: unhandled.append(context)
+        )
+        songs = await Search()._Search__fan_out("query", None, 5)
+        await asyncio.sleep(0)
+        gc.collect()
+        return songs
+
+    assert asyncio.run(main()) == ["song"]
+    gc.collect()
+    assert unhandled == []
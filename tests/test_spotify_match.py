@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+from cogs.music.core import song as song_module
+from cogs.music.core.song import SpotifySongMeta, createSong
+from cogs.music.services.spotify.match_store import MatchStore
+from cogs.music.services.spotify.service import SpotifyService
+
+
+def test_invalidated_match_is_searched_again(monkeypatch, tmp_path) -> None:
+    track = SimpleNamespace(id="track", name="Track", duration_ms=200_000, artists=[])
+    searches: List[str] = []
+    fetched: List[str] = []
+
+    async def get_track(track_id: str) -> SimpleNamespace:
+        return track
+
+    def match_youtube_video(song: SimpleNamespace):
+        video_id = f"video{len(searches)}"
+        searches.append(video_id)
+        return SimpleNamespace(video_id=video_id), 1.0
+
+    def youtube(url: str, client: str) -> SimpleNamespace:
+        fetched.append(url)
+        return SimpleNamespace(video_id=url.rsplit("=", 1)[1])
+
+    async def no_stream(video: SimpleNamespace) -> None:
+        return None
+
+    spotify = object.__new__(SpotifyService)
+    spotify.get_track = get_track
+    store = object.__new__(MatchStore)
+    store.__init__(str(tmp_path / "matches.db"))
+    monkeypatch.setattr(SpotifyService, "_instance", spotify)
+    monkeypatch.setattr(MatchStore, "_instance", store)
+    monkeypatch.setattr(song_module, "_match_youtube_video", match_youtube_video)
+    monkeypatch.setattr(song_module, "YouTube", youtube)
+    monkeypatch.setattr(song_module, "_fetch_video", lambda video: video)
+    monkeypatch.setattr(song_module, "_select_youtube_stream", no_stream)
+
+    meta = SpotifySongMeta(
+        title="Track",
+        duration_ms=200_000,
+        playlist_name=None,
+        webpage_url="https://open.spotify.com/track/track",
+        author="Artist",
+        requester_id=1,
+        track_id="track",
+    )
+
+    async def main() -> None:
+        await store.put("track", "stale", 1.0)
+        # The saved video has no playable stream: the match is dropped.
+        assert await createSong(meta) is None
+        assert await store.get("track") is None
+        # The next play searches YouTube again instead of using the dropped match.
+        assert await createSong(meta) is None
+
+    asyncio.run(main())
+    assert fetched == ["https://www.youtube.com/watch?v=stale"]
+    assert searches == ["video0"]
@@ -0,0 +1,161 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+from cogs.music.services.youtube import service
+
+PLAYLIST_SIZE = 250
+PAGE_SIZE = 100
+
+
+def _video(i: int) -> Dict[str, Any]:
+    return {
+        "playlistVideoRenderer": {
+            "videoId": f"video{i:04d}",
+            "title": {"runs": [{"text": f"Video {i}"}]},
+            "lengthSeconds": "200",
+            "shortBylineText": {"runs": [{"text": "Channel"}]},
+        }
+    }
+
+
+def _items(page: int) -> List[Dict[str, Any]]:
+    start = page * PAGE_SIZE
+    items = [_video(i) for i in range(start, min(start + PAGE_SIZE, PLAYLIST_SIZE))]
+    if start + PAGE_SIZE < PLAYLIST_SIZE:
+        items.append(
+            {
+                "continuationItemRenderer": {
+                    "continuationEndpoint": {
+                        "continuationCommand": {"token": str(page + 1)}
+                    }
+                }
+            }
+        )
+    return items
+
+
+def _playlist_data() -> Dict[str, Any]:
+    """The initial data of the playlist web page, with the first page of videos."""
+    renderer = {"playlistVideoListRenderer": {"contents": _items(0)}}
+    section = {"itemSectionRenderer": {"contents": [renderer]}}
+    tab = {"tabRenderer": {"content": {"sectionListRenderer": {"contents": [section]}}}}
+    return {"contents": {"twoColumnBrowseResultsRenderer": {"tabs": [tab]}}}
+
+
+class Requests:
+    """Counts the requests made to YouTube, by kind."""
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {"playlist": 0, "browse": 0, "search": 0, "watch": 0}
+
+
+@pytest.fixture
+def requests(monkeypatch: pytest.MonkeyPatch) -> Requests:
+    counter = Requests()
+
+    class FakePlaylist:
+        def __init__(self, url: str, client: str = "WEB") -> None:
+            self.title = "Playlist"
+
+        @property
+        def initial_data(self) -> Dict[str, Any]:
+            counter.counts["playlist"] += 1
+            return _playlist_data()
+
+    class FakeInnerTube:
+        def __init__(self, client: str) -> None:
+            pass
+
+        def browse(self, continuation: str, visitor_data: Optional[str] = None) -> Dict[str, Any]:
+            counter.counts["browse"] += 1
+            return {
+                "onResponseReceivedActions": [
+                    {
+                        "appendContinuationItemsAction": {
+                            "continuationItems": _items(int(continuation))
+                        }
+                    }
+                ]
+            }
+
+    class FakeSearch:
+        def __init__(self, query: str, client: str = "WEB") -> None:
+            pass
+
+        def fetch_query(self) -> Dict[str, Any]:
+            counter.counts["search"] += 1
+            videos = [
+                {
+                    "videoRenderer": {
+                        "videoId": f"result{i}",
+                        "title": {"runs": [{"text": f"Result {i}"}]},
+                        "lengthText": {"simpleText": "3:20"},
+                        "ownerText": {"runs": [{"text": "Channel"}]},
+                    }
+                }
+                for i in range(20)
+            ]
+            return {
+                "contents": {
+                    "twoColumnSearchResultsRenderer": {
+                        "primaryContents": {
+                            "sectionListRenderer": {
+                                "contents": [{"itemSectionRenderer": {"contents": videos}}]
+                            }
+                        }
+                    }
+                }
+            }
+
+    def fake_youtube(*args, **kwargs):
+        counter.counts["watch"] += 1
+        raise AssertionError("A watch page was fetched for a single video.")
+
+    monkeypatch.setattr(service, "Playlist", FakePlaylist)
+    monkeypatch.setattr(service, "InnerTube", FakeInnerTube)
+    monkeypatch.setattr(service, "Search", FakeSearch)
+    # Listing videos must never build a `YouTube` object, which fetches its watch page.
+    from cogs.music import extractor
+
+    monkeypatch.setattr(extractor, "YouTube", fake_youtube)
+    return counter
+
+
+def test_playlist_costs_one_request_per_page(requests: Requests) -> None:
+    from cogs.music.extractor import YoutubeExtractor
+
+    ctx = SimpleNamespace(author=SimpleNamespace(id=1))
+
+    async def main() -> List[Any]:
+        songs = []
+        async for page in YoutubeExtractor().iter_data(
+            "https://www.youtube.com/playlist?list=PL", ctx, is_playlist=True
+        ):
+            songs.extend(page)
+        return songs
+
+    songs = asyncio.run(main())
+
+    pages = -(-PLAYLIST_SIZE // PAGE_SIZE)
+    assert len(songs) == PLAYLIST_SIZE
+    assert requests.counts == {"playlist": 1, "browse": pages - 1, "search": 0, "watch": 0}
+    assert songs[0].title == "Video 0"
+    assert songs[0].duration_ms == 200_000
+    assert songs[0].author == "Channel"
+
+
+def test_search_costs_one_request(requests: Requests) -> None:
+    from cogs.music.extractor import YoutubeExtractor
+
+    ctx = SimpleNamespace(author=SimpleNamespace(id=1))
+
+    async def main() -> List[Any]:
+        return await YoutubeExtractor().get_data("query", ctx, is_search=True, limit=10)
+
+    songs = asyncio.run(main())
+
+    assert len(songs) == 10
+    assert requests.counts == {"playlist": 0, "browse": 0, "search": 1, "watch": 0}
+    assert songs[0].duration_ms == 200_000
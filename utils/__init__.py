@@ -3,7 +3,7 @@ import functools
 import logging
 import logging.handlers
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import sys
 import shutil
 from pathlib import Path
@@ -22,25 +22,6 @@ def to_thread(func: Callable) -> Coroutine:
     return wrapper  # type: ignore
 
 
-def convert_to_second(time: str) -> float:
-    """Converts a time string with '%H:%M:%S' format to seconds."""
-    parsed_datetime: datetime = datetime.strptime(time, "%H:%M:%S")
-    dt: timedelta = parsed_datetime - datetime(1900, 1, 1)
-    return dt.total_seconds()
-
-
-def convert_to_time(seconds: float) -> str:
-    """Converts seconds to a time string with '%H:%M:%S' format."""
-    return str(timedelta(seconds=seconds))
-
-
-def get_time() -> str:
-    """Get the current time in '%H:%M:%S' format."""
-    dt = datetime.now().time()
-    timestr = f"{dt.hour}:{dt.minute}:{dt.second}"
-    return timestr
-
-
 def safe_getattr(obj: Any, attr: str, default: Any) -> Any:
     """Safely get an attribute from an object."""
     return getattr(obj, attr, default) if obj else default
@@ -62,19 +43,17 @@ def format_playback_count(playback_count: int) -> str:
 def format_duration(
     duration: float, unit: Literal["seconds", "milliseconds"] = "seconds"
 ) -> str:
-    """Format the duration to a string.
+    """Format the duration to a 'H:MM:SS' string.
     Args:
         duration (float): The duration in seconds.
         unit (str): The unit to format the duration to. Default is 'seconds'.
         Returns:
-        str: The formatted duration.
+        str: The formatted duration. Negative durations are formatted as 0:00:00.
     """
-    if unit == "milliseconds":
-        duration_fmt = timedelta(milliseconds=duration)
-        duration_fmt -= timedelta(microseconds=duration_fmt.microseconds)
-    else:  # default to seconds
-        duration_fmt = timedelta(seconds=duration)
-    return str(duration_fmt)
+    seconds = int(duration // 1000 if unit == "milliseconds" else duration)
+    minutes, seconds = divmod(max(seconds, 0), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
 
 
 def get_env(key: str) -> Union[str, None]:
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A bounded LRU cache whose entries also expire after a time-to-live.
+
+    Not thread-safe; it is meant to be used from the event loop only.
+
+    Attributes:
+        maxsize (int): Maximum number of entries, the least recently used entry is evicted first.
+        ttl (float): Default time-to-live of an entry in seconds.
+        hits, misses, evictions, expirations (int): Usage counters.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Get a value and mark it as recently used.
+
+        Args:
+            key (K): The key to look up.
+            default (V | None): Returned if the key is missing or expired.
+
+        Returns:
+            V | None: The cached value or `default`.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (K): The key.
+            value (V): The value.
+            ttl (float | None): Time-to-live in seconds. Defaults to `self.ttl`.
+                                A non-positive value means the value is not cached.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> Optional[V]:
+        """Remove a key and return its value, or None if it was not cached."""
+        entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the size and usage counters of the cache."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Collapses concurrent calls for the same key into a single call.
+
+    The first caller for a key starts the work as a task; callers arriving while it
+    runs await the same task. A caller being cancelled does not cancel the shared work.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[K, asyncio.Task[V]] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        """
+        Run `func` unless a call for `key` is already in flight, and return its result.
+
+        Args:
+            key (K): Identifies identical calls.
+            func (Callable[[], Awaitable[V]]): Starts the work.
+
+        Returns:
+            V: The result of the shared call. Exceptions are raised to every caller.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: K, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception in case every caller has been cancelled.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,88 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Dict, TypeVar
+
+import constants
+from patterns.singleton import SingletonMeta
+
+
+T = TypeVar("T")
+
+
+class ProviderExecutor(metaclass=SingletonMeta):
+    """
+    A bounded thread pool for the blocking I/O of music providers (pytubefix, spotipy,
+    soundcloud-v2), so it never runs on the event loop.
+
+    Each provider has its own concurrency limit, so a slow provider can't take every
+    worker. A slot is held until the blocking call has really finished, even if the
+    awaiting coroutine was cancelled. Calls still waiting for a slot or a worker when
+    they are cancelled never run.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = constants.PROVIDER_MAX_WORKERS,
+        limits: Dict[str, int] = constants.PROVIDER_CONCURRENCY,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="provider"
+        )
+        self._limits = limits
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(
+                self._limits.get(provider, constants.PROVIDER_DEFAULT_CONCURRENCY)
+            )
+        return self._semaphores[provider]
+
+    async def run(self, provider: str, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run a blocking function in the pool.
+
+        Args:
+            provider (str): The provider whose concurrency limit applies, e.g. "youtube".
+            func (Callable): The blocking function.
+            *args, **kwargs: Passed to `func`.
+
+        Returns:
+            The return value of `func`. Exceptions raised by `func` are propagated.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(provider)
+        await semaphore.acquire()
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(semaphore.release)
+        )
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_blocking(
+    provider: str, func: Callable[..., T], *args, **kwargs
+) -> Coroutine[Any, Any, T]:
+    """Shortcut for `ProviderExecutor().run`."""
+    return ProviderExecutor().run(provider, func, *args, **kwargs)
+
+
+def in_executor(provider: str) -> Callable[[Callable[..., T]], Callable[..., Coroutine[Any, Any, T]]]:
+    """Decorator turning a blocking function into a coroutine run by `ProviderExecutor`."""
+
+    def decorator(func: Callable[..., T]) -> Callable[..., Coroutine[Any, Any, T]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(provider, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
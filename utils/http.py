@@ -0,0 +1,143 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import aiohttp
+import constants
+from patterns.singleton import SingletonMeta
+from utils.metrics import Histogram
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class HostStats:
+    """
+    Usage counters of the connections to a host.
+
+    Parameters:
+    - host (str): The host name.
+    - requests (int): Requests sent.
+    - errors (int): Requests that failed before getting a response.
+    - new_connections (int): Connections opened (TCP, and TLS for https).
+    - reused_connections (int): Requests sent on a kept-alive connection.
+    - latency (Histogram): Time to get the response headers, in seconds.
+    """
+
+    host: str
+    requests: int = 0
+    errors: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    latency: Histogram = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.latency = Histogram(f"http_latency_seconds_{self.host}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        connections = self.new_connections + self.reused_connections
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_rate": round(self.reused_connections / connections, 4) if connections else 0.0,
+            "latency": self.latency.snapshot(),
+        }
+
+
+class HttpClient(metaclass=SingletonMeta):
+    """
+    The HTTP client shared by the bot for the requests it makes itself (provider
+    APIs, utility commands).
+
+    One `aiohttp` session keeps a pool of keep-alive connections per host and caches
+    DNS lookups, so most requests skip the TCP and TLS handshakes. Requests time out
+    after `HTTP_TIMEOUT` seconds. Connection reuse and latency are counted per host,
+    see `stats`.
+
+    The session is created on first use, from the event loop, and closed by `close`
+    when the bot shuts down.
+    """
+
+    def __init__(self) -> None:
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._hosts: Dict[str, HostStats] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(self._on_request_start)
+            trace.on_request_end.append(self._on_request_end)
+            trace.on_request_exception.append(self._on_request_exception)
+            trace.on_connection_create_end.append(self._on_connection_created)
+            trace.on_connection_reuseconn.append(self._on_connection_reused)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=constants.HTTP_POOL_SIZE,
+                    limit_per_host=constants.HTTP_POOL_SIZE_PER_HOST,
+                    ttl_dns_cache=constants.HTTP_DNS_CACHE_TTL,
+                    keepalive_timeout=constants.HTTP_KEEPALIVE_TIMEOUT,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=constants.HTTP_TIMEOUT,
+                    connect=constants.HTTP_CONNECT_TIMEOUT,
+                ),
+                trace_configs=[trace],
+            )
+        return self._session
+
+    async def get_json(self, url: str, **kwargs) -> Any:
+        """
+        GET a JSON document.
+
+        Args:
+            url (str): The URL.
+            **kwargs: Passed to `aiohttp.ClientSession.get`, e.g. `params`, `headers`.
+
+        Raises:
+            aiohttp.ClientResponseError: The response status is 4xx or 5xx.
+        """
+        async with self.session.get(url, raise_for_status=True, **kwargs) as response:
+            # Some APIs don't send a JSON content type.
+            return await response.json(content_type=None)
+
+    async def get_text(self, url: str, **kwargs) -> str:
+        """GET a text document, see `get_json`."""
+        async with self.session.get(url, raise_for_status=True, **kwargs) as response:
+            return await response.text()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the connection and latency counters of every host."""
+        return {host: stats.snapshot() for host, stats in self._hosts.items()}
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            _log.info(f"HTTP stats: {self.stats()}")
+
+    def _host(self, ctx: SimpleNamespace) -> HostStats:
+        host = ctx.host
+        if host not in self._hosts:
+            self._hosts[host] = HostStats(host)
+        return self._hosts[host]
+
+    async def _on_request_start(self, session, ctx: SimpleNamespace, params) -> None:
+        ctx.host = params.url.host or ""
+        ctx.start = time.perf_counter()
+        self._host(ctx).requests += 1
+
+    async def _on_request_end(self, session, ctx: SimpleNamespace, params) -> None:
+        self._host(ctx).latency.observe(time.perf_counter() - ctx.start)
+
+    async def _on_request_exception(self, session, ctx: SimpleNamespace, params) -> None:
+        self._host(ctx).errors += 1
+
+    async def _on_connection_created(self, session, ctx: SimpleNamespace, params) -> None:
+        self._host(ctx).new_connections += 1
+
+    async def _on_connection_reused(self, session, ctx: SimpleNamespace, params) -> None:
+        self._host(ctx).reused_connections += 1
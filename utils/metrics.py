@@ -0,0 +1,61 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A small thread-safe histogram with fixed upper-bound buckets.
+
+    Values are usually latencies in seconds. It is safe to call `observe` from
+    the audio player thread as well as from the event loop.
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.buckets: List[float] = sorted(buckets)
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single value."""
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    @property
+    def count(self) -> int:
+        """Not locked, read `snapshot` when other threads observe values."""
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        """Not locked, read `snapshot` when other threads observe values."""
+        return self._sum / self._count if self._count else 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Returns a copy of the current state of the histogram.
+
+        Returns:
+            dict: Count, sum, mean, max and the per-bucket counts keyed by the bucket
+            upper bound ("+Inf" for values above the last bucket).
+        """
+        with self._lock:
+            labels = [str(b) for b in self.buckets] + ["+Inf"]
+            return {
+                "name": self.name,
+                "count": self._count,
+                "sum": round(self._sum, 4),
+                "mean": round(self.mean, 4),
+                "max": round(self._max, 4),
+                "buckets": dict(zip(labels, self._counts)),
+            }
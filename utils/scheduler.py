@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Callable, List, Optional, Tuple, TypeVar
+
+import aiohttp
+import requests
+from utils.executor import run_blocking
+
+_log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class TokenBucket:
+    """
+    Limits the rate of requests: `rate` tokens are added per second, up to `burst`.
+
+    Only used from the event loop.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a token. Waiters are served in order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _status(error: BaseException) -> Optional[int]:
+    """The HTTP status of a `requests` or `aiohttp` error, if it has one."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """The delay asked by a throttled response, in seconds, if any."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        headers = error.headers
+    else:
+        response = getattr(error, "response", None)
+        headers = response.headers if response is not None else None
+    value = headers.get("Retry-After") if headers else None
+    if value is None or not value.isdigit():
+        return None
+    return float(value)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(
+        error,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            aiohttp.ClientConnectionError,
+            asyncio.TimeoutError,
+        ),
+    ):
+        return True
+    return _status(error) in RETRY_STATUSES
+
+
+class RequestScheduler:
+    """
+    Schedules the requests of a provider so it doesn't throttle us. A request is
+    either a blocking function, run in `ProviderExecutor`, or a coroutine function,
+    e.g. one using `HttpClient`.
+
+    - At most `concurrency` requests run at once, on top of the concurrency limit of
+      the provider in `ProviderExecutor`.
+    - Requests start at most at `rate` per second, with bursts of `burst`.
+    - A request failing with a connection error, 429 or 5xx is retried up to
+      `max_retries` times. The delay doubles from `backoff` seconds up to
+      `max_backoff`, with full jitter, or is the one given by `Retry-After`. The
+      concurrency slot is released while waiting.
+
+    Attributes:
+        retries (int): Number of requests retried.
+        throttled (int): Number of 429 responses.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        concurrency: int,
+        rate: float,
+        burst: int,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10,
+    ) -> None:
+        self.provider = provider
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._bucket = TokenBucket(rate, burst)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.retries = 0
+        self.throttled = 0
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run a request, retrying it if it can be.
+
+        Returns:
+            The return value of `func`. The last exception is raised if every try failed.
+        """
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                async with self._semaphore:
+                    if asyncio.iscoroutinefunction(func):
+                        return await func(*args, **kwargs)
+                    return await run_blocking(self.provider, func, *args, **kwargs)
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                if _status(e) == 429:
+                    self.throttled += 1
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = random.uniform(
+                        0, min(self.max_backoff, self.backoff * 2**attempt)
+                    )
+                attempt += 1
+                self.retries += 1
+                _log.warning(
+                    f"{self.provider} request failed ({e!r}), retry {attempt}/{self.max_retries} in {delay:.2f}s."
+                )
+                await asyncio.sleep(delay)
+
+    async def map(
+        self, func: Callable[[T], R], items: List[T]
+    ) -> AsyncIterator[Tuple[int, R]]:
+        """
+        Run `func` on every item, and yield the results as they finish.
+
+        Closing the iterator early cancels the requests that didn't start yet.
+
+        Yields:
+            Tuple[int, R]: The index of the item and its result. An exception is
+            raised as soon as a request failed for good, after cancelling the others.
+        """
+        tasks = [asyncio.create_task(self._indexed(i, func, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _indexed(self, index: int, func: Callable[[T], R], item: T) -> Tuple[int, R]:
+        return index, await self.run(func, item)
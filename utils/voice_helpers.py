@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from cogs.music.controller import Audio, PlayerManager
+from cogs.music.core.snapshot import SnapshotStore
 
 async def ensure_same_channel(ctx: commands.Context) -> bool:
     """
@@ -34,5 +35,10 @@ def get_or_create_audio(bot: commands.Bot, guild_id: int) -> Audio:
     """
     player_manager = PlayerManager()
     if guild_id not in player_manager.players:
-        player_manager.players[guild_id] = Audio(bot)
+        audio = Audio(bot, guild_id=guild_id)
+        # The queue saved before a restart is restored on first use of the guild.
+        snapshot = SnapshotStore().take(guild_id)
+        if snapshot is not None:
+            audio.playlist_manager.restore_snapshot(snapshot)
+        player_manager.players[guild_id] = audio
     return player_manager.players[guild_id]